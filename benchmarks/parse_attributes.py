@@ -0,0 +1,139 @@
+"""Compares the single-pass attribute validator with the parsing it replaced.
+
+Both parsers first have to agree on every input of tests/test_attributes.py,
+valid and malformed ones, then each one is timed on those inputs as one sheet.
+Run it from the repository root with python -m benchmarks.parse_attributes.
+"""
+import time
+
+from argparse import ArgumentParser
+from typing import Callable, List, Optional
+
+from pnpbot.character import (
+    Attribute,
+    AttributeParseException,
+    AnonymousAttributeException,
+    UnknownAttributeException,
+)
+from pnpbot.systems.dsa import System
+from tests.test_attributes import AttributeInputs
+
+
+def legacy_from_str(text: str) -> Attribute:
+    name = ""
+    if "=" in text:
+        sep_pos = text.find("=")
+        name = text[:sep_pos].strip()
+        text = text[sep_pos + 1 :].strip()
+
+    if "/" not in text:
+        try:
+            value = int(text)
+        except Exception:
+            raise AttributeParseException(name)
+
+        return Attribute(name=name, value=value)
+
+    parts = text.split("/")
+
+    limited = False
+    minimum = 0
+    try:
+        limited = True
+        if len(parts) == 3:
+            minimum = int(parts.pop(0))
+
+        value, maximum = map(int, parts)
+    except Exception:
+        raise AttributeParseException(name)
+
+    if minimum > maximum:
+        raise AttributeParseException(name)
+
+    return Attribute(
+        name=name, value=value, minimum=minimum, maximum=maximum, limited=limited
+    )
+
+
+def legacy_find_proper_name(system: System, name: str) -> Optional[str]:
+    for attribute in system.Attributes:
+        attribute_name = (
+            attribute.name if isinstance(attribute, Attribute) else attribute
+        )
+        if attribute_name.lower() == name.lower():
+            return attribute_name
+
+    return None
+
+
+def legacy_validate(system: System, attributes: List[str]) -> List[object]:
+    # One attribute after the other, with a linear name lookup each
+    result: List[object] = []
+    defined = []
+    for text in attributes:
+        try:
+            stat = legacy_from_str(text)
+        except Exception as e:
+            result.append(type(e))
+            continue
+
+        defined.append(stat.name.lower())
+
+        if not stat.name:
+            result.append(AnonymousAttributeException)
+            continue
+
+        proper_name = legacy_find_proper_name(system, stat.name)
+        if not proper_name:
+            result.append(UnknownAttributeException)
+            continue
+
+        result.append((proper_name, stat.value, stat.minimum, stat.maximum))
+
+    names = [legacy_find_proper_name(system, name) for name in system.attribute_names()]
+    result.append([name for name in names if name and name.lower() not in defined])
+    return result
+
+
+def describe(from_str: Callable[[str], Attribute], text: str) -> object:
+    try:
+        stat = from_str(text)
+    except Exception as e:
+        return type(e), getattr(e, "stat_name", None)
+
+    return stat.name, stat.value, stat.minimum, stat.maximum, stat.limited
+
+
+def check_agreement():
+    for text in AttributeInputs:
+        old = describe(legacy_from_str, text)
+        new = describe(Attribute.from_str, text)
+        if old != new:
+            raise AssertionError(f"{text!r}: {old} before, {new} now")
+
+
+def benchmark(iterations: int):
+    system = System()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        legacy_validate(system, AttributeInputs)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        system.validate_attributes(AttributeInputs)
+    seconds = time.perf_counter() - start
+
+    print(f"{iterations} x {len(AttributeInputs)} attributes")
+    print(f"  per attribute: {legacy_seconds:.2f}s")
+    print(f"  single pass:   {seconds:.2f}s ({legacy_seconds / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    check_agreement()
+    benchmark(args.iterations)
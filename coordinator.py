@@ -0,0 +1,30 @@
+import logging
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from pnpbot.cluster import Coordinator, load_campaigns
+from pnpbot.shared import SharedStoreFile
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARN,
+        format="%(asctime)s - %(levelname)s [%(processName)s %(filename)s]: %(message)s",
+    )
+    _logger = logging.getLogger("pnpbot")
+    _logger.setLevel(logging.DEBUG)
+    parser = ArgumentParser()
+    parser.add_argument(
+        "campaigns",
+        type=Path,
+        help="JSON list of campaigns with name, token, channel, system and locale",
+    )
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--store", type=Path, default=SharedStoreFile)
+    parser.add_argument("--lease-ttl", type=float, default=30.0)
+
+    args = parser.parse_args()
+
+    campaigns = load_campaigns(args.campaigns)
+    _logger.info(f"Serving {len(campaigns)} campaigns with {args.workers} workers")
+    Coordinator(args.store, campaigns, args.workers, args.lease_ttl).run()
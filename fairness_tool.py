@@ -0,0 +1,67 @@
+import logging
+import sys
+
+from argparse import ArgumentParser
+
+from pnpbot.bot import load_system
+from pnpbot.fairness import (
+    ExpectedOutcomes,
+    OutcomeKeys,
+    RngBackends,
+    benchmark_backend,
+    run_fairness,
+)
+from pnpbot.systems.base import Dice
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARN,
+        format="%(asctime)s - %(levelname)s [%(filename)s]: %(message)s",
+    )
+    parser = ArgumentParser()
+    parser.add_argument("system", choices=sorted(ExpectedOutcomes))
+    parser.add_argument("args", type=int, nargs="+", help="Arguments of !roll")
+    parser.add_argument("--dice", type=Dice, default=Dice("3d20"))
+    parser.add_argument("--rolls", type=int, default=1_000_000)
+    parser.add_argument("--backend", choices=sorted(RngBackends), action="append")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--alpha", type=float, default=0.001, help="Fail below this p-value"
+    )
+
+    args = parser.parse_args()
+
+    system = load_system(args.system)
+    failed = False
+    for backend in args.backend or sorted(RngBackends):
+        report = run_fairness(
+            args.system,
+            system,
+            backend,
+            args.rolls,
+            args.dice,
+            *args.args,
+            seed=args.seed,
+        )
+        raw = benchmark_backend(backend, args.dice, args.rolls, args.seed)
+
+        print(f"{backend}: {report.rolls_per_second:,.0f} rolls/s ({raw:,.0f} bare)")
+        for name, result in [
+            ("faces chi²", report.faces),
+            ("faces KS", report.faces_ks),
+            ("outcomes chi²", report.outcomes),
+        ]:
+            verdict = "ok" if result.p_value >= args.alpha else "FAILED"
+            failed |= result.p_value < args.alpha
+            print(
+                f"  {name:<14} {result.statistic:>10.4f}  p={result.p_value:.4f} {verdict}"
+            )
+
+        for key in OutcomeKeys:
+            rate = report.outcome_counts.get(key, 0) / report.rolls
+            print(
+                f"  {key:<17} {rate:.5f} (expected {report.expected_outcomes[key]:.5f})"
+            )
+
+    system.shutdown()
+    sys.exit(1 if failed else 0)
@@ -1,7 +1,7 @@
 import logging
+import time
 
 from argparse import ArgumentParser
-from pnpbot.bot import PnPBot
 
 if __name__ == "__main__":
     logging.basicConfig(
@@ -14,9 +14,22 @@ if __name__ == "__main__":
     parser.add_argument("--token", required=True)
     parser.add_argument("--channel", type=int, required=True)
     parser.add_argument("--system", required=True)
+    parser.add_argument("--feed", help="Unix socket path for the change feed")
+    parser.add_argument(
+        "--feed-token", help="Token change feed observers need to patch characters"
+    )
+    parser.add_argument("--locale", default="de")
 
     args = parser.parse_args()
 
+    # discord.py is only imported once the arguments are known to be valid
+    start = time.perf_counter()
+    from pnpbot.bot import PnPBot
+
+    _logger.info(f"Imported bot in {time.perf_counter() - start:.2f}s")
+
     _logger.info("Starting up bot ...")
-    bot = PnPBot(args.system, args.channel)
+    bot = PnPBot(
+        args.system, args.channel, args.feed, args.locale, feed_token=args.feed_token
+    )
     bot.run(args.token)
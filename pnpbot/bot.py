@@ -1,24 +1,60 @@
+import asyncio
+import io
 import logging
 import random
-import pickle
+import time
 
-from typing import Optional, Union, Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Optional, Union, Any, Callable, Dict, Iterable, List, Set, Tuple
 from pathlib import Path
 
+import discord
+
 from discord.ext import commands
 from discord.ext.commands import Context, command
 
 from .systems.base import BaseSystem
+from .combat import CombatCog
+from .effects import EffectScheduler, EffectsCog
+from .storage import PickleStorage, Storage, save_profile
+from .messages import (
+    Catalogs,
+    DefaultLocale,
+    MessageCatalog,
+    UnknownLocaleException,
+    get_catalog,
+)
+from .sheets import (
+    ImportReport,
+    SheetFormat,
+    describe_attribute_error,
+    UnknownSheetFormatException,
+    export_sheets,
+    read_sheets,
+    resolve_chunk,
+    validate_chunks,
+)
+from .feed import ChangeFeed, attribute_state, encode_attributes
+from .ratelimit import CommandRateLimiter, RateLimitedCog, RateLimitedException
+from .profiler import SamplingProfiler
+from .shared import LeaseLostException
+from .executor import (
+    ComputeBusyException,
+    ComputeFailedException,
+    ComputeQueueFullException,
+    ComputeTimeoutException,
+)
 from .character import (
     Character,
     AttributeParseException,
     Attribute,
     AnonymousAttributeException,
-    MissingAttributesException,
-    UnknownAttributeException,
     NotSpendableException,
     OverflowAttributeException,
     UnderflowAttributeException,
+    UnknownAttributeException,
+    VersionConflictException,
 )
 
 
@@ -26,7 +62,22 @@ _logger = logging.getLogger("pnpbot")
 
 
 class PnPBot(commands.Bot):
-    def __init__(self, system: str, channel_id: int):
+    # Number of characters listed by name in the startup log
+    RosterSample = 5
+
+    def __init__(
+        self,
+        system: str,
+        channel_id: int,
+        feed_path: Optional[str] = None,
+        locale: str = DefaultLocale,
+        command_costs: Optional[Dict[str, float]] = None,
+        storage: Optional[Storage] = None,
+        feed_token: Optional[str] = None,
+    ):
+        self.startup_begin = time.perf_counter()
+        self.startup_timings: Dict[str, float] = {}
+
         super().__init__(
             command_prefix="!", description="",
         )
@@ -34,46 +85,247 @@ class PnPBot(commands.Bot):
         self.system = load_system(system)
         self.channel_id = channel_id
         self.characters: Dict[int, Character] = {}
+        self.storage = storage or PickleStorage()
+        # A single thread, so the writes land in the order they were made
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="pnpbot-storage")
 
         self.play_channel = None
+        self.default_locale = get_catalog(locale).locale
+        self.locales = self.storage.load_locales()
+        self.rate_limiter = CommandRateLimiter(command_costs)
+        self.profiler = SamplingProfiler()
+        self.effects = EffectScheduler(self)
+        self.stats_loaded: Optional[asyncio.Future] = None
+        self.ready_once = False
+
+        # Observers only cost anything when the change feed is enabled
+        self.feed_path = feed_path
+        self.feed = (
+            ChangeFeed(request_handler=self.feed_request, patch_token=feed_token)
+            if feed_path
+            else None
+        )
 
         self.add_cog(PnPCog(self))
+        self.add_cog(CombatCog(self))
+        self.add_cog(EffectsCog(self))
+        self.record_phase("init")
+
+    def record_phase(self, phase: str):
+        self.startup_timings[phase] = time.perf_counter() - self.startup_begin
+
+    async def start(self, *args, **kwargs):
+        # Load the stats file in the background while we log in to Discord
+        self.stats_loaded = self.loop.run_in_executor(None, self.read_stats)
+        if self.feed:
+            await self.feed.serve(self.feed_path)
+        await super().start(*args, **kwargs)
+
+    async def wait_for_stats(self):
+        if self.stats_loaded is None:
+            self.stats_loaded = self.loop.run_in_executor(None, self.read_stats)
+
+        if "stats" not in self.startup_timings:
+            # Every waiter gets the very same dict, so assigning it repeatedly is harmless
+            self.characters = await self.stats_loaded
+            if self.feed:
+                self.feed.reset(self.characters)
+            self.record_phase("stats")
 
     async def on_ready(self):
+        if self.ready_once:
+            _logger.info("Reconnected to Discord")
+            return
+        self.ready_once = True
+
         _logger.info(f"Logged in as {self.user.name} (#{self.user.id})")
-        self.load_stats()
+        self.record_phase("login")
 
         self.play_channel = self.get_channel(self.channel_id)
 
         if not self.play_channel:
             _logger.error("Unable to locate play channel!")
-            self.close()
+            await self.close()
+            return
 
-        _logger.info("Loaded characters:")
-        for user_id, stat in self.characters.items():
-            _logger.info(str(stat))
+        await self.wait_for_stats()
+
+        names = [c.name for c in islice(self.characters.values(), self.RosterSample)]
+        if len(self.characters) > len(names):
+            names.append("...")
+        _logger.info(f"Loaded {len(self.characters)} characters: {', '.join(names)}")
+
+        self.record_phase("ready")
+        timings = ", ".join(f"{k} {v:.2f}s" for k, v in self.startup_timings.items())
+        _logger.info(f"Startup timings: {timings}")
+
+    async def on_command_error(self, ctx: Context, exception: Exception):
+        if isinstance(exception, RateLimitedException):
+            # Answering with a message would only eat into the channel's rate limit
+            _logger.debug(
+                f"Rate limited {ctx.author} by {exception.scope} for {exception.retry_after:.1f}s"
+            )
+            await ctx.message.add_reaction("⏳")
+            return
+
+        await super().on_command_error(ctx, exception)
+
+    async def close(self):
+        self.effects.close()
+        if self.feed:
+            self.feed.close()
+        self.system.shutdown()
+        # Pending writes still go through
+        await self.loop.run_in_executor(None, self.writer.shutdown)
+        await super().close()
+
+    def read_stats(self) -> Dict[int, Character]:
+        characters = self.storage.load_characters()
+        # Characters stored by an older version get the current formulas and flags
+        for character in characters.values():
+            self.system.migrate_character(character)
+
+        return characters
 
     def load_stats(self):
-        if not Path("stats.pickle").exists():
-            self.characters = {}
+        self.characters = self.read_stats()
+
+    def write(self, func: Callable, *args) -> asyncio.Future:
+        # The storage may have to wait for a lock, which must not block the loop
+        written = self.loop.run_in_executor(self.writer, func, *args)
+        written.add_done_callback(self.written)
+        return written
+
+    def written(self, written: asyncio.Future):
+        if written.cancelled() or written.exception() is None:
             return
 
-        with open("stats.pickle", "rb") as stream:
-            self.characters = pickle.loads(stream.read())
+        e = written.exception()
+        if isinstance(e, LeaseLostException):
+            # Another worker owns the campaign now and has the last persisted state
+            _logger.error(f"Lost the lease on campaign {e.campaign}, shutting down")
+            self.loop.create_task(self.close())
+        else:
+            _logger.error("Saving failed", exc_info=e)
 
-    def save_stats(self):
-        with open("stats.pickle", "wb") as stream:
-            stream.write(pickle.dumps(self.characters))
+    def save_stats(self, user_ids: Iterable[int] = ()) -> asyncio.Future:
+        # Serialized right away, later changes can't leak into this write
+        dump = self.storage.dump_characters(self.characters, user_ids)
+        return self.write(self.storage.write_characters, dump)
 
-    def add_character(self, user_id: int, name: str, *args) -> Character:
+    async def commit(self, *user_ids: int):
+        # Only confirmed once it's stored, a crashing worker can't lose the change
+        await self.save_stats(user_ids)
+
+        if not self.feed:
+            return
+
+        for user_id in user_ids:
+            character = self.characters.get(user_id)
+            if character:
+                self.feed.character_updated(user_id, character)
+            else:
+                self.feed.character_deleted(user_id)
+
+    async def add_character(self, user_id: int, name: str, *args) -> Character:
         self.characters[user_id] = Character(name, *args)
-        self.save_stats()
+        await self.commit(user_id)
 
         return self.characters[user_id]
 
-    def delete_character(self, user_id: int):
+    async def add_characters(self, entries: List[Tuple[int, str, List[Attribute]]]):
+        for user_id, name, attributes in entries:
+            self.characters[user_id] = Character(name, attributes)
+
+        await self.commit(*(user_id for user_id, _, _ in entries))
+
+    async def patch_character(
+        self,
+        user_id: int,
+        expected_version: int,
+        values: Dict[str, Union[int, Attribute]],
+    ) -> int:
+        version = self.characters[user_id].apply_patch(expected_version, values)
+        await self.commit(user_id)
+
+        return version
+
+    def character_changes(
+        self, user_id: int, since: int
+    ) -> Tuple[int, List[Attribute]]:
+        character = self.characters[user_id]
+        return character.version, character.changes_since(since)
+
+    async def feed_request(self, request: dict) -> dict:
+        """Answers the change and patch requests of change feed observers."""
+        await self.wait_for_stats()
+
+        invalid = {"type": "error", "error": "invalid_request"}
+        try:
+            user_id = int(request["player"])
+        except (KeyError, TypeError, ValueError):
+            return invalid
+
+        if user_id not in self.characters:
+            return {"type": "error", "error": "unknown_player"}
+
+        try:
+            if request.get("type") == "changes":
+                since = int(request["since"])
+                version, changes = self.character_changes(user_id, since)
+                states = {stat.name.lower(): attribute_state(stat) for stat in changes}
+                return {
+                    "type": "changes",
+                    "player": user_id,
+                    "version": version,
+                    "attributes": encode_attributes(states),
+                }
+
+            if request.get("type") == "patch":
+                # Limited attributes are patched as value/maximum, just like !set
+                values: Dict[str, Union[int, Attribute]] = {}
+                for name, value in request["values"].items():
+                    if isinstance(value, int):
+                        values[str(name)] = value
+                    else:
+                        values[str(name)] = Attribute.from_str(str(value))
+
+                expected = int(request["version"])
+                version = await self.patch_character(user_id, expected, values)
+                return {"type": "patched", "player": user_id, "version": version}
+        except VersionConflictException as e:
+            return {"type": "error", "error": "version_conflict", "version": e.actual}
+        except UnknownAttributeException as e:
+            return {"type": "error", "error": "unknown_attribute", "name": e.stat_name}
+        except (OverflowAttributeException, UnderflowAttributeException):
+            return {"type": "error", "error": "out_of_range"}
+        except (
+            AttributeParseException,
+            AttributeError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ):
+            return invalid
+
+        return invalid
+
+    async def delete_character(self, user_id: int):
         del self.characters[user_id]
-        self.save_stats()
+        await self.commit(user_id)
+
+    def messages(self, guild: Optional[discord.Guild]) -> MessageCatalog:
+        if guild is None:
+            return get_catalog(self.default_locale)
+
+        return get_catalog(self.locales.get(guild.id, self.default_locale))
+
+    async def set_locale(self, guild: discord.Guild, locale: str) -> MessageCatalog:
+        messages = get_catalog(locale)
+        self.locales[guild.id] = locale
+        await self.write(self.storage.save_locale, guild.id, locale)
+
+        return messages
 
     def get_character(self, user_id: int) -> Optional[Character]:
         return self.characters.get(user_id, None)
@@ -82,21 +334,21 @@ class PnPBot(commands.Bot):
         return user_id in self.characters
 
 
-class PnPCog(commands.Cog):
-    def __init__(self, bot: PnPBot):
-        super().__init__()
-
-        self.bot = bot
+class PnPCog(RateLimitedCog):
+    # Upper bound for !profile, and how many functions it lists
+    MaxProfileSeconds = 120
+    ProfileTop = 10
 
     @commands.command()
     @commands.has_any_role("DM")
     async def add(
         self, ctx: Context, player: str, character_name: str, *raw_attributes
     ):
+        messages = self.bot.messages(ctx.guild)
         member = ctx.guild.get_member_named(player)
 
         if not member:
-            await ctx.send(f"Spieler '{player}' nicht gefunden!")
+            await ctx.send(messages.render("player_not_found", player=player))
             return
 
         if member.id in self.bot.characters:
@@ -104,97 +356,184 @@ class PnPCog(commands.Cog):
             assert character is not None
 
             await ctx.send(
-                f"Der Spieler {member.name} hat schon einen Charakter ({character.name})!"
+                messages.render(
+                    "player_has_character", player=member.name, name=character.name
+                )
             )
             return
 
-        try:
-            attributes = self.bot.system.parse_attributes(list(raw_attributes))
-        except (AnonymousAttributeException, AttributeParseException) as e:
-            error_stat = ""
-            if e.stat_name:
-                error_stat = f"Fehler im Attribut '{e.stat_name}'! "
+        attributes, errors = self.bot.system.validate_attributes(list(raw_attributes))
+        if errors:
+            lines = [describe_attribute_error(e, messages) for e in errors]
+            if any(
+                isinstance(e, (AnonymousAttributeException, AttributeParseException))
+                for e in errors
+            ):
+                lines.append(messages.render("attribute_format"))
 
-            await ctx.send(
-                f"{error_stat}Alle Attribute müssen im Format _name=wert/maximum_ (z.B. Stärke=5/12) angegeben werden!"
-            )
-            return
-        except UnknownAttributeException as e:
-            await ctx.send(f"Unbekanntes Attribut '{e.stat_name}'!")
-            return
-        except MissingAttributesException as e:
-            await ctx.send(f"Folgende Attribute fehlen: {', '.join(e.missing)}!")
+            await ctx.send("\n".join(lines))
             return
 
-        character = self.bot.add_character(member.id, character_name, attributes)
+        character = await self.bot.add_character(member.id, character_name, attributes)
 
-        await ctx.send(f"Charakter für '{player}' ({member.id}) hinzugefügt!")
+        await ctx.send(messages.render("character_added", player=player, id=member.id))
 
-        msg = f"Charakter '{character_name}' hinzugefügt!\n"
-        msg += str(character)
         assert self.bot.play_channel is not None
-        await self.bot.play_channel.send(msg)
+        await self.bot.play_channel.send(
+            messages.render(
+                "character_announced", name=character_name, character=character
+            )
+        )
 
     @commands.command()
     @commands.has_any_role("DM")
     async def delete(self, ctx: Context, player: str):
+        messages = self.bot.messages(ctx.guild)
         member = ctx.guild.get_member_named(player)
 
         if not member:
-            await ctx.send(f"Spieler '{player}' nicht gefunden!")
+            await ctx.send(messages.render("player_not_found", player=player))
+            return
+
+        await self.bot.delete_character(member.id)
+        await ctx.send(
+            messages.render("character_deleted", player=player, id=member.id)
+        )
+
+    @commands.command(name="import")
+    @commands.has_any_role("DM")
+    async def import_(self, ctx: Context):
+        messages = self.bot.messages(ctx.guild)
+        if not ctx.message.attachments:
+            await ctx.send(messages.render("import_attach"))
+            return
+
+        attachment = ctx.message.attachments[0]
+        try:
+            sheet_format = SheetFormat.from_filename(attachment.filename)
+        except UnknownSheetFormatException:
+            await ctx.send(messages.render("import_format"))
+            return
+
+        content = (await attachment.read()).decode("utf-8-sig")
+
+        def resolve_player(player: str) -> Optional[int]:
+            if player.isdigit():
+                return int(player)
+
+            member = ctx.guild.get_member_named(player)
+            return member.id if member else None
+
+        report = ImportReport()
+        seen: Set[int] = set()
+
+        async def import_chunk(chunk):
+            # Nothing can add a character between these checks and the commit
+            entries = resolve_chunk(
+                chunk, resolve_player, self.bot.characters, seen, report, messages
+            )
+            if entries:
+                await self.bot.add_characters(entries)
+                report.imported += len(entries)
+
+        def validate():
+            # Validating a large sheet would block the loop, so it happens in a
+            # thread, and every chunk is committed on the loop before the next one
+            rows = read_sheets(io.StringIO(content), sheet_format, messages)
+            for chunk in validate_chunks(self.bot.system, rows):
+                committed = asyncio.run_coroutine_threadsafe(
+                    import_chunk(chunk), self.bot.loop
+                )
+                committed.result()
+
+        await self.bot.loop.run_in_executor(None, validate)
+
+        lines = [
+            messages.render(
+                "import_done", imported=report.imported, errors=len(report.errors)
+            )
+        ]
+        lines.extend(error.render(messages) for error in report.errors[:20])
+        if len(report.errors) > 20:
+            lines.append(
+                messages.render("import_more_errors", count=len(report.errors) - 20)
+            )
+
+        await ctx.send("\n".join(lines))
+
+    @commands.command()
+    @commands.has_any_role("DM")
+    async def export(self, ctx: Context, format_name: str = "csv"):
+        try:
+            sheet_format = SheetFormat(format_name.lower())
+        except ValueError:
+            await ctx.send(self.bot.messages(ctx.guild).render("export_usage"))
             return
 
-        await ctx.send(f"Spieler '{player}' ({member.id}) gelöscht!")
-        self.bot.delete_character(member.id)
+        content = "".join(
+            export_sheets(
+                self.bot.characters, self.bot.system.attribute_names(), sheet_format
+            )
+        )
+        await ctx.send(
+            file=discord.File(
+                io.BytesIO(content.encode("utf-8")),
+                filename=f"characters.{sheet_format.value}",
+            )
+        )
 
     @commands.command()
     async def set(self, ctx: Context, player: str, value: str):
+        messages = self.bot.messages(ctx.guild)
         member = ctx.guild.get_member_named(player)
 
         if not member:
-            await ctx.send(f"Spieler '{player}' nicht gefunden!")
+            await ctx.send(messages.render("player_not_found", player=player))
             return
 
         character = self.bot.get_character(member.id)
         if not character:
-            await ctx.send(f"Spieler '{player}' hat keinen Charakter!")
+            await ctx.send(messages.render("player_has_no_character", player=player))
             return
 
         try:
             new_stat = Attribute.from_str(value)
         except AttributeParseException:
-            await ctx.send(
-                "Der Wert muss entweder eine Zahl oder im Format x/y (z.B. 5/8) sein."
-            )
+            await ctx.send(messages.render("set_value_format"))
             return
 
         if not new_stat.name:
-            await ctx.send(
-                "Verwendung: !set *player* *attributname*=*wert* (z.B.: !set MyPlayer intelligenz=5, !set MyPlayer hp=3/12"
-            )
+            await ctx.send(messages.render("set_usage"))
             return
 
         if not character.has_attribute(new_stat.name):
             await ctx.send(
-                f"Der Charakter {character.name} hat kein Attribut namens '{new_stat.name}'!"
+                messages.render(
+                    "attribute_not_found", character=character.name, name=new_stat.name
+                )
             )
             return
         stat = character.get_attribute(new_stat.name)
+        assert stat is not None
 
-        stat.update(new_stat)
+        character.update(stat.name, new_stat)
+        await self.bot.commit(member.id)
 
         assert self.bot.play_channel is not None
         await self.bot.play_channel.send(
-            f":bust_in_silhouette: {character.name} hat jetzt :clipboard: **{stat} {stat.name}**."
+            messages.render(
+                "set_done", character=character.name, value=stat, name=stat.name
+            )
         )
 
     @commands.command()
     async def stats(self, ctx: Context, player: Optional[str] = None):
+        messages = self.bot.messages(ctx.guild)
         if player:
             member = ctx.guild.get_member_named(player)
 
             if not member:
-                await ctx.send(f"Spieler '{player}' nicht gefunden!")
+                await ctx.send(messages.render("player_not_found", player=player))
                 return
         else:
             member = ctx.message.author
@@ -202,76 +541,97 @@ class PnPCog(commands.Cog):
         character = self.bot.get_character(member.id)
 
         if not character:
-            await ctx.send(f"Charakter nicht gefunden!")
+            await ctx.send(messages.render("character_not_found"))
             return
 
         await ctx.send(str(character))
 
     @commands.command()
     async def spend(self, ctx: Context, amount: int, attribute_name: str):
+        messages = self.bot.messages(ctx.guild)
         member = ctx.message.author
         character = self.bot.get_character(member.id)
 
         if not character:
-            await ctx.send(f"Spieler nicht gefunden!")
+            await ctx.send(messages.render("no_player"))
             return
 
         attribute = character.get_attribute(attribute_name)
 
         if not attribute:
             await ctx.send(
-                f"Der Charakter {character.name} hat kein Attribut namens '{attribute_name}'!"
+                messages.render(
+                    "attribute_not_found", character=character.name, name=attribute_name
+                )
             )
             return
 
         try:
-            attribute.spend(amount)
+            character.spend(attribute.name, amount)
         except NotSpendableException:
-            await ctx.send(f"Das Attribut {attribute.name} kann man nicht ausgeben!")
+            await ctx.send(
+                messages.render("attribute_not_spendable", name=attribute.name)
+            )
             return
         except UnderflowAttributeException as e:
             await ctx.send(
-                f"Du hast nur noch {e.current} {attribute.name} und kannst nicht unter {e.minium} sein!"
+                messages.render(
+                    "attribute_underflow",
+                    current=e.current,
+                    name=attribute.name,
+                    minimum=e.minium,
+                )
             )
             return
 
-        self.bot.save_stats()
-        await (
-            ctx.send(
-                f":bust_in_silhouette: {character.name} :clipboard: :arrow_lower_right: **{attribute} {attribute.name}**"
+        await self.bot.commit(member.id)
+        await ctx.send(
+            messages.render(
+                "spend_done",
+                character=character.name,
+                value=attribute,
+                name=attribute.name,
             )
         )
 
     @commands.command()
     async def gain(self, ctx: Context, amount: int, attribute_name: str):
+        messages = self.bot.messages(ctx.guild)
         member = ctx.message.author
         character = self.bot.get_character(member.id)
 
         if not character:
-            await ctx.send(f"Spieler nicht gefunden!")
+            await ctx.send(messages.render("no_player"))
             return
 
         attribute = character.get_attribute(attribute_name)
 
         if not attribute:
             await ctx.send(
-                f"Der Charakter {character.name} hat kein Attribut namens '{attribute_name}'!"
+                messages.render(
+                    "attribute_not_found", character=character.name, name=attribute_name
+                )
             )
             return
 
         try:
-            attribute.gain(amount)
+            character.gain(attribute.name, amount)
         except NotSpendableException:
-            await ctx.send(f"Das Attribut {attribute.name} kann man nicht ausgeben!")
+            await ctx.send(
+                messages.render("attribute_not_spendable", name=attribute.name)
+            )
             return
         except OverflowAttributeException as e:
             # For convenience, we simply set the attribute to its maximum instead of demanding a user action
-            attribute.update(e.maximum)
-
-        self.bot.save_stats()
-        await (
-            ctx.send(
-                f":bust_in_silhouette: {character.name} :clipboard: :arrow_upper_right: **{attribute} {attribute.name}**"
+            character.update(attribute.name, e.maximum)
+
+        await self.bot.commit(member.id)
+        await ctx.send(
+            messages.render(
+                "gain_done",
+                character=character.name,
+                value=attribute,
+                name=attribute.name,
             )
         )
 
@@ -281,13 +641,105 @@ class PnPCog(commands.Cog):
         member = ctx.message.author
         character = self.bot.get_character(member.id)
 
-        await self.bot.system.handle_roll(
-            ctx, character, **self.bot.system.parse_roll_args(args)
-        )
+        await self.bot.system.roll(ctx, character, list(args))
 
     @roll.error
     async def roll_error(self, ctx, error):
-        await ctx.send(self.bot.system.RollHelp)
+        if isinstance(error, RateLimitedException):
+            return
+
+        await ctx.send(self.bot.messages(ctx.guild).render(self.bot.system.RollHelp))
+
+    @commands.command()
+    async def odds(self, ctx, *args):
+        """Calculates the odds of a roll."""
+        member = ctx.message.author
+        character = self.bot.get_character(member.id)
+
+        messages = self.bot.messages(ctx.guild)
+        try:
+            await self.bot.system.handle_odds(ctx, character, *args)
+        except ComputeBusyException:
+            await ctx.send(messages.render("compute_busy"))
+        except ComputeQueueFullException:
+            await ctx.send(messages.render("compute_full"))
+        except ComputeTimeoutException as e:
+            await ctx.send(messages.render("compute_timeout", timeout=e.timeout))
+        except ComputeFailedException:
+            await ctx.send(messages.render("compute_failed"))
+
+    @commands.command()
+    @commands.has_any_role("DM")
+    async def language(self, ctx: Context, locale: str):
+        try:
+            messages = await self.bot.set_locale(ctx.guild, locale.lower())
+        except UnknownLocaleException:
+            messages = self.bot.messages(ctx.guild)
+            await ctx.send(
+                messages.render("language_usage", locales="|".join(sorted(Catalogs)))
+            )
+            return
+
+        await ctx.send(messages.render("language_done"))
+
+    @commands.command()
+    @commands.has_any_role("DM")
+    async def profile(self, ctx: Context, seconds: float):
+        messages = self.bot.messages(ctx.guild)
+        if not 0 < seconds <= self.MaxProfileSeconds:
+            await ctx.send(
+                messages.render("profile_usage", maximum=self.MaxProfileSeconds)
+            )
+            return
+
+        if self.bot.profiler.running:
+            await ctx.send(messages.render("profile_running"))
+            return
+
+        self.bot.profiler.start()
+        await ctx.message.add_reaction("⏱️")
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            report = self.bot.profiler.stop()
+
+        collapsed = report.collapsed()
+        path = save_profile(collapsed)
+        _logger.info(f"Wrote profile to {path}")
+
+        lines = [
+            messages.render(
+                "profile_done",
+                duration=report.duration,
+                busy=report.busy_samples,
+                samples=report.samples,
+            )
+        ]
+        lines.extend(
+            messages.render("profile_line", function=function, own=own, total=total)
+            for function, own, total in report.top_functions(self.ProfileTop)
+        )
+        if report.slow_callbacks:
+            lines.append(
+                messages.render("profile_slow", count=len(report.slow_callbacks))
+            )
+            lines.extend(f"• {callback}" for callback in report.slow_callbacks[:5])
+
+        await ctx.send(
+            # Discord rejects messages longer than 2000 characters
+            "\n".join(lines)[:2000],
+            file=discord.File(
+                io.BytesIO(collapsed.encode("utf-8")), filename=path.name
+            ),
+        )
+
+    @profile.error
+    async def profile_error(self, ctx: Context, error):
+        if isinstance(error, commands.UserInputError):
+            messages = self.bot.messages(ctx.guild)
+            await ctx.send(
+                messages.render("profile_usage", maximum=self.MaxProfileSeconds)
+            )
 
 
 def load_system(name: str) -> BaseSystem:
@@ -1,4 +1,6 @@
-from typing import Optional, List, Union
+import ast
+import math
+from typing import Callable, Optional, List, Union, Dict, Set
 
 
 class AttributeParseException(Exception):
@@ -41,7 +43,86 @@ class NotSpendableException(Exception):
     pass
 
 
+class FormulaParseException(Exception):
+    def __init__(self, expression: str):
+        super().__init__()
+        self.expression = expression
+
+
+class FormulaCycleException(Exception):
+    def __init__(self, names: List[str]):
+        super().__init__()
+        self.names = names
+
+
+class VersionConflictException(Exception):
+    def __init__(self, expected: int, actual: int):
+        super().__init__()
+        self.expected = expected
+        self.actual = actual
+
+
+class Formula:
+    AllowedNodes = (
+        ast.Expression,
+        ast.BinOp,
+        ast.UnaryOp,
+        ast.Add,
+        ast.Sub,
+        ast.Mult,
+        ast.Div,
+        ast.FloorDiv,
+        ast.USub,
+        ast.UAdd,
+        ast.Constant,
+        ast.Name,
+        ast.Load,
+    )
+
+    def __init__(self, expression: str):
+        self._compile(expression)
+
+    def _compile(self, expression: str):
+        self.expression = expression
+
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError:
+            raise FormulaParseException(expression)
+
+        self.dependencies: Set[str] = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, self.AllowedNodes):
+                raise FormulaParseException(expression)
+
+            if isinstance(node, ast.Constant) and not isinstance(node.value, int):
+                raise FormulaParseException(expression)
+
+            # Attribute names are case insensitive, just like in Character
+            if isinstance(node, ast.Name):
+                node.id = node.id.lower()
+                self.dependencies.add(node.id)
+
+        self._code = compile(tree, "<formula>", "eval")
+
+    def evaluate(self, values: Dict[str, int]) -> int:
+        result = eval(self._code, {"__builtins__": {}}, values)
+        # Round half up, as pen & paper rules usually do
+        return math.floor(result + 0.5)
+
+    def __getstate__(self) -> str:
+        # Code objects can't be pickled, so only the expression is stored
+        return self.expression
+
+    def __setstate__(self, expression: str):
+        self._compile(expression)
+
+
 class Attribute:
+    formula: Optional[Formula] = None
+    # Version of the character when this attribute last changed
+    version = 0
+
     def __init__(
         self,
         *,
@@ -51,6 +132,7 @@ class Attribute:
         maximum: int = 0,
         limited: bool = False,
         spendable: bool = False,
+        formula: Optional[Formula] = None,
     ):
         self.name = name
         self.value = value
@@ -58,6 +140,8 @@ class Attribute:
         self.maximum = maximum
         self.limited = limited
         self.spendable = spendable
+        # Derived attributes compute their maximum (if limited) or value from others
+        self.formula = formula
 
         if self.limited:
             if self.value < self.minimum:
@@ -67,38 +151,35 @@ class Attribute:
 
     @staticmethod
     def from_str(text: str) -> "Attribute":
-        name = ""
-        if "=" in text:
-            sep_pos = text.find("=")
-            name = text[:sep_pos].strip()
-            text = text[sep_pos + 1 :].strip()
-
-        if "/" not in text:
-            try:
-                value = int(text)
-            except Exception:
-                raise AttributeParseException(name)
-
-            return Attribute(name=name, value=value)
+        # [name=]value, [name=]value/maximum or [name=]minimum/value/maximum
+        name, sep, text = text.partition("=")
+        if sep:
+            name = name.strip()
+        else:
+            name, text = "", name
 
         parts = text.split("/")
+        if len(parts) > 3:
+            raise AttributeParseException(name)
 
-        limited = False
-        minimum = 0
         try:
-            limited = True
-            if len(parts) == 3:
-                minimum = int(parts.pop(0))
-
-            value, maximum = map(int, parts)
-        except Exception:
+            numbers = [int(part) for part in parts]
+        except ValueError:
             raise AttributeParseException(name)
 
+        if len(numbers) == 1:
+            return Attribute(name=name, value=numbers[0])
+
+        if len(numbers) == 2:
+            minimum, value, maximum = 0, numbers[0], numbers[1]
+        else:
+            minimum, value, maximum = numbers
+
         if minimum > maximum:
             raise AttributeParseException(name)
 
         return Attribute(
-            name=name, value=value, minimum=minimum, maximum=maximum, limited=limited
+            name=name, value=value, minimum=minimum, maximum=maximum, limited=True
         )
 
     def __str__(self) -> str:
@@ -147,12 +228,161 @@ class Attribute:
                 self.minimum = value.minimum
                 self.maximum = value.maximum
 
+    def apply_formula(self, result: int):
+        if not self.limited:
+            self.value = result
+            return
+
+        # A full pool stays full when its maximum grows
+        if self.value == self.maximum or self.value > result:
+            self.value = result
+        self.maximum = result
+
 
 class Character:
+    # Incremented with every change, characters pickled before had version 0
+    version = 0
+
     def __init__(self, name: str, stats: List[Attribute]):
         self.name = name
         self.attributes = {stat.name.lower(): stat for stat in stats}
 
+        self.build_dependencies()
+        for derived in self.derived_order:
+            self.recompute_attribute(derived)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["dependents"]
+        del state["derived_order"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.build_dependencies()
+
+    def build_dependencies(self):
+        # Topologically sort all derived attributes, so each is computed after its inputs
+        self.derived_order: List[str] = []
+        inputs: Dict[str, Set[str]] = {}
+        visiting: List[str] = []
+
+        def visit(name: str):
+            if name in visiting:
+                raise FormulaCycleException(visiting[visiting.index(name) :])
+            if name in inputs:
+                return
+
+            formula = self.attributes[name].formula
+            if formula is None:
+                return
+
+            visiting.append(name)
+            inputs[name] = set()
+            for dependency in formula.dependencies:
+                if dependency not in self.attributes:
+                    raise UnknownAttributeException(dependency)
+
+                visit(dependency)
+                inputs[name].add(dependency)
+                inputs[name] |= inputs.get(dependency, set())
+            visiting.pop()
+
+            self.derived_order.append(name)
+
+        for name in self.attributes:
+            visit(name)
+
+        # For every attribute, the derived attributes affected by a change, in order
+        self.dependents: Dict[str, List[str]] = {}
+        for derived in self.derived_order:
+            for name in inputs[derived]:
+                self.dependents.setdefault(name, []).append(derived)
+
+    def recompute_attribute(self, name: str):
+        stat = self.attributes[name]
+        assert stat.formula is not None
+
+        values = {
+            dependency: self.attributes[dependency].value
+            for dependency in stat.formula.dependencies
+        }
+        stat.apply_formula(stat.formula.evaluate(values))
+
+    def attribute_changed(self, name: str):
+        # Stamps the attribute and every derived attribute it affected with the version
+        self.attributes[name.lower()].version = self.version
+        for derived in self.dependents.get(name.lower(), []):
+            stat = self.attributes[derived]
+            before = (stat.value, stat.maximum)
+            self.recompute_attribute(derived)
+            if (stat.value, stat.maximum) != before:
+                stat.version = self.version
+
+    def _apply(self, name: str, change: Callable[[Attribute], None]) -> bool:
+        stat = self.attributes[name.lower()]
+        before = (stat.value, stat.minimum, stat.maximum)
+        change(stat)
+
+        # Derived values can't be overwritten, only the current value of a pool
+        if stat.formula is not None:
+            self.recompute_attribute(name.lower())
+
+        return (stat.value, stat.minimum, stat.maximum) != before
+
+    def _changed(self, *names: str):
+        # Changes that didn't change anything don't create a new version
+        if names:
+            self.version += 1
+            for name in names:
+                self.attribute_changed(name)
+
+    def spend(self, name: str, amount: int):
+        if self._apply(name, lambda stat: stat.spend(amount)):
+            self._changed(name)
+
+    def gain(self, name: str, amount: int):
+        if self._apply(name, lambda stat: stat.gain(amount)):
+            self._changed(name)
+
+    def update(self, name: str, value: Union[int, Attribute]):
+        if self._apply(name, lambda stat: stat.update(value)):
+            self._changed(name)
+
+    def changes_since(self, version: int) -> List[Attribute]:
+        return [stat for stat in self.attributes.values() if stat.version > version]
+
+    def apply_patch(
+        self, expected_version: int, values: Dict[str, Union[int, Attribute]]
+    ) -> int:
+        """Applies all values as a single change, only if nobody changed the character
+        since expected_version. Either all values are applied or none."""
+        if expected_version != self.version:
+            raise VersionConflictException(expected_version, self.version)
+
+        for name in values:
+            if name.lower() not in self.attributes:
+                raise UnknownAttributeException(name)
+
+        backup = {
+            key: (stat.value, stat.minimum, stat.maximum)
+            for key, stat in self.attributes.items()
+        }
+        try:
+            changed = [
+                name
+                for name, value in values.items()
+                if self._apply(name, lambda stat: stat.update(value))
+            ]
+        except (OverflowAttributeException, UnderflowAttributeException):
+            for key, state in backup.items():
+                stat = self.attributes[key]
+                stat.value, stat.minimum, stat.maximum = state
+            raise
+
+        self._changed(*changed)
+        return self.version
+
     def has_attribute(self, name: str) -> bool:
         return name.lower() in self.attributes
 
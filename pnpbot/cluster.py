@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from .bot import PnPBot
+from .messages import DefaultLocale
+from .shared import CampaignStorage, SharedStore
+
+_logger = logging.getLogger("pnpbot")
+
+
+class Campaign(NamedTuple):
+    name: str
+    token: str
+    channel: int
+    system: str
+    locale: str = DefaultLocale
+
+
+def load_campaigns(path: Path) -> List[Campaign]:
+    with open(path, "r", encoding="utf-8") as stream:
+        return [Campaign(**entry) for entry in json.load(stream)]
+
+
+def assign_campaigns(
+    campaigns: List[str], workers: List[str], current: Dict[str, str]
+) -> Dict[str, str]:
+    """Keeps campaigns with their worker while it's alive, the rest go to the least loaded."""
+    load = {worker: 0 for worker in workers}
+    assignments = {}
+    for campaign in campaigns:
+        worker = current.get(campaign)
+        if worker in load:
+            assignments[campaign] = worker
+            load[worker] += 1
+
+    for campaign in campaigns:
+        if campaign not in assignments:
+            worker = min(workers, key=lambda w: load[w])
+            assignments[campaign] = worker
+            load[worker] += 1
+
+    return assignments
+
+
+class Worker:
+    """Runs one bot per campaign assigned to this worker, as long as it holds the lease."""
+
+    def __init__(
+        self,
+        name: str,
+        store: SharedStore,
+        campaigns: List[Campaign],
+        lease_ttl: float = 30.0,
+    ):
+        self.name = name
+        self.store = store
+        self.campaigns = {campaign.name: campaign for campaign in campaigns}
+        self.lease_ttl = lease_ttl
+        self.bots: Dict[str, Tuple[PnPBot, int, asyncio.Task]] = {}
+
+    async def run(self):
+        try:
+            while True:
+                await self.tick()
+                # Renew well before the lease runs out
+                await asyncio.sleep(self.lease_ttl / 3)
+        finally:
+            for name in list(self.bots):
+                await self.stop_campaign(name)
+
+    async def tick(self):
+        loop = asyncio.get_event_loop()
+        assignments = await loop.run_in_executor(None, self.store.assignments)
+        assigned = {
+            campaign
+            for campaign, worker in assignments.items()
+            if worker == self.name and campaign in self.campaigns
+        }
+
+        for name, (_, token, task) in list(self.bots.items()):
+            if task.done() or name not in assigned:
+                await self.stop_campaign(name)
+            elif not await loop.run_in_executor(
+                None, self.store.renew, name, self.name, token, self.lease_ttl
+            ):
+                _logger.error(f"Lost the lease on campaign {name}")
+                await self.stop_campaign(name)
+
+        for name in sorted(assigned - set(self.bots)):
+            # Fails until the lease of a previous owner expired or was released
+            token = await loop.run_in_executor(
+                None, self.store.acquire, name, self.name, self.lease_ttl
+            )
+            if token is not None:
+                self.start_campaign(name, token)
+
+    def start_campaign(self, name: str, token: int):
+        campaign = self.campaigns[name]
+        _logger.info(f"Worker {self.name} takes over campaign {name} (lease {token})")
+
+        bot = PnPBot(
+            campaign.system,
+            campaign.channel,
+            locale=campaign.locale,
+            storage=CampaignStorage(self.store, name, token),
+        )
+        task = asyncio.get_event_loop().create_task(bot.start(campaign.token))
+        self.bots[name] = (bot, token, task)
+
+    async def stop_campaign(self, name: str):
+        bot, token, task = self.bots.pop(name)
+        if not bot.is_closed():
+            await bot.close()
+
+        try:
+            await task
+        except Exception:
+            _logger.exception(f"Bot for campaign {name} failed")
+
+        self.store.release(name, self.name, token)
+        _logger.info(f"Worker {self.name} released campaign {name}")
+
+
+def run_worker(
+    name: str, store_path: Path, campaigns: List[Campaign], lease_ttl: float
+):
+    worker = Worker(name, SharedStore(store_path), campaigns, lease_ttl)
+    try:
+        asyncio.get_event_loop().run_until_complete(worker.run())
+    except KeyboardInterrupt:
+        pass
+
+
+class Coordinator:
+    """Starts the worker processes and assigns campaigns to them.
+
+    Ownership is only handed over through the leases in the shared store: a worker
+    that dies is restarted under the same name and takes its campaigns back with its
+    own leases. Only a worker that dies again within a lease of its restart hands
+    them over, and the new worker takes over as soon as the old lease expired.
+    """
+
+    def __init__(
+        self,
+        store_path: Path,
+        campaigns: List[Campaign],
+        workers: int,
+        lease_ttl: float = 30.0,
+        check_interval: float = 5.0,
+    ):
+        self.store_path = store_path
+        self.store = SharedStore(store_path)
+        self.campaigns = campaigns
+        self.worker_names = [f"worker-{i}" for i in range(workers)]
+        self.lease_ttl = lease_ttl
+        self.check_interval = check_interval
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.started: Dict[str, float] = {}
+
+    def start_worker(self, name: str):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(name, self.store_path, self.campaigns, self.lease_ttl),
+            name=name,
+        )
+        process.start()
+        self.processes[name] = process
+        self.started[name] = time.monotonic()
+
+    def reassign(self, workers: List[str]):
+        assignments = assign_campaigns(
+            [campaign.name for campaign in self.campaigns],
+            workers,
+            self.store.assignments(),
+        )
+        self.store.assign(assignments)
+
+    def restart(self, dead: List[str]):
+        now = time.monotonic()
+        failing = [name for name in dead if now - self.started[name] < self.lease_ttl]
+        for name in dead:
+            self.start_worker(name)
+
+        # Everybody else keeps their campaigns, or gets them back after the restart
+        workers = [name for name in self.worker_names if name not in failing]
+        self.reassign(workers or self.worker_names)
+
+    def run(self):
+        self.reassign(self.worker_names)
+        for name in self.worker_names:
+            self.start_worker(name)
+
+        try:
+            while True:
+                time.sleep(self.check_interval)
+
+                dead = [n for n, p in self.processes.items() if not p.is_alive()]
+                if not dead:
+                    continue
+
+                _logger.warning(f"Workers died: {', '.join(dead)}")
+                self.restart(dead)
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+                process.join()
@@ -0,0 +1,391 @@
+import copy
+import heapq
+import logging
+
+from itertools import count
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from .messages import MessageCatalog, get_catalog
+from .ratelimit import RateLimitedCog
+from .character import (
+    Attribute,
+    AttributeParseException,
+    Character,
+    NotSpendableException,
+    OverflowAttributeException,
+    UnderflowAttributeException,
+)
+
+if TYPE_CHECKING:
+    from .bot import PnPBot
+
+
+_logger = logging.getLogger("pnpbot")
+
+
+class DuplicateCombatantException(Exception):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+
+class Combatant:
+    def __init__(
+        self,
+        name: str,
+        character: Character,
+        initiative: int,
+        user_id: Optional[int] = None,
+    ):
+        self.name = name
+        self.character = character
+        self.initiative = initiative
+        # NPCs have no user and are never persisted
+        self.user_id = user_id
+        self.defeated = False
+
+    @property
+    def npc(self) -> bool:
+        return self.user_id is None
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.initiative})"
+
+
+class Combat:
+    def __init__(
+        self,
+        messages: Optional[MessageCatalog] = None,
+        defeat_attribute: Optional[str] = None,
+    ):
+        self.messages = messages or get_catalog()
+        self.defeat_attribute = defeat_attribute.lower() if defeat_attribute else None
+        self.combatants: Dict[str, Combatant] = {}
+        self.round = 0
+        self.current: Optional[Combatant] = None
+        self.log: List[str] = []
+
+        # Heap of (-initiative, insertion order, name), defeated entries are skipped lazily
+        self._queue: List[Tuple[int, int, str]] = []
+        self._order = count()
+
+    def name_taken(self, name: str, user_id: Optional[int] = None) -> bool:
+        # Only a player may take their own place again, NPCs are never the same
+        existing = self.combatants.get(name.lower())
+        return existing is not None and (user_id is None or existing.user_id != user_id)
+
+    def add(self, combatant: Combatant):
+        name = combatant.name.lower()
+        if self.name_taken(name, combatant.user_id):
+            raise DuplicateCombatantException(combatant.name)
+
+        rejoined = name in self.combatants
+        self.combatants[name] = combatant
+
+        # Late joiners still get their turn in the current round. Anyone joining again
+        # keeps the turn they had, the new initiative counts from the next round
+        if self.round and not rejoined:
+            self._push(combatant)
+
+    def _push(self, combatant: Combatant):
+        heapq.heappush(
+            self._queue,
+            (-combatant.initiative, next(self._order), combatant.name.lower()),
+        )
+
+    def find(self, pattern: str) -> List[Combatant]:
+        pattern = pattern.lower()
+        if pattern.endswith("*"):
+            return [
+                c
+                for name, c in self.combatants.items()
+                if name.startswith(pattern[:-1])
+            ]
+
+        combatant = self.combatants.get(pattern)
+        return [combatant] if combatant else []
+
+    def order(self) -> List[Combatant]:
+        return sorted(
+            (c for c in self.combatants.values() if not c.defeated),
+            key=lambda c: -c.initiative,
+        )
+
+    def start_round(self):
+        self.round += 1
+        self._queue = []
+        for combatant in self.combatants.values():
+            if not combatant.defeated:
+                self._push(combatant)
+
+    def next_turn(self) -> Tuple[Optional[Combatant], bool]:
+        new_round = False
+        while True:
+            if not self._queue:
+                if new_round or not self.order():
+                    self.current = None
+                    return None, new_round
+
+                self.start_round()
+                new_round = True
+
+            _, _, name = heapq.heappop(self._queue)
+            combatant = self.combatants.get(name)
+            if combatant and not combatant.defeated:
+                self.current = combatant
+                return combatant, new_round
+
+    def apply_damage(
+        self, targets: List[Combatant], amount: int, attribute_name: str
+    ) -> List[Combatant]:
+        changed = []
+        for combatant in targets:
+            character = combatant.character
+            stat = character.get_attribute(attribute_name)
+            if not stat:
+                self.log.append(
+                    self.messages.render(
+                        "combat.no_attribute",
+                        name=combatant.name,
+                        attribute=attribute_name,
+                    )
+                )
+                continue
+
+            try:
+                if amount >= 0:
+                    character.spend(stat.name, amount)
+                else:
+                    character.gain(stat.name, -amount)
+            except NotSpendableException:
+                self.log.append(
+                    self.messages.render(
+                        "combat.not_spendable", name=combatant.name, attribute=stat.name
+                    )
+                )
+                continue
+            except UnderflowAttributeException as e:
+                character.update(stat.name, e.minium)
+            except OverflowAttributeException as e:
+                character.update(stat.name, e.maximum)
+
+            self.log.append(
+                self.messages.render(
+                    "combat.changed",
+                    name=combatant.name,
+                    amount=amount,
+                    attribute=stat.name,
+                    value=stat,
+                )
+            )
+            # Only the system's vitality decides, healing it gets a combatant back up
+            if stat.name.lower() == self.defeat_attribute:
+                defeated = stat.value <= stat.minimum
+                if defeated != combatant.defeated:
+                    key = "combat.defeated" if defeated else "combat.revived"
+                    self.log.append(self.messages.render(key, name=combatant.name))
+                combatant.defeated = defeated
+
+            changed.append(combatant)
+
+        return changed
+
+    def summary(self) -> str:
+        order = ", ".join(str(c) for c in self.order())
+        lines = [
+            self.messages.render("combat.round", round=self.round),
+            self.messages.render("combat.order", order=order),
+        ]
+        if self.log:
+            lines.append(self.messages.render("combat.last_round"))
+            lines.extend(f"• {entry}" for entry in self.log)
+
+        return "\n".join(lines)
+
+
+class CombatCog(RateLimitedCog):
+    # Upper bound for the NPCs added by a single !combat npc
+    MaxNPCs = 20
+
+    def __init__(self, bot: "PnPBot"):
+        super().__init__(bot)
+
+        self.combats: Dict[int, Combat] = {}
+
+    @commands.group()
+    async def combat(self, ctx: Context):
+        if ctx.invoked_subcommand is None:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.usage"))
+
+    def get_combat(self, ctx: Context) -> Optional[Combat]:
+        return self.combats.get(ctx.channel.id, None)
+
+    @combat.command()
+    @commands.has_any_role("DM")
+    async def start(self, ctx: Context):
+        messages = self.bot.messages(ctx.guild)
+        if ctx.channel.id in self.combats:
+            await ctx.send(messages.render("combat.running"))
+            return
+
+        self.combats[ctx.channel.id] = Combat(messages, self.bot.system.DefeatAttribute)
+        await ctx.send(messages.render("combat.started"))
+
+    @combat.command()
+    async def join(self, ctx: Context, initiative: Optional[int] = None):
+        combat = self.get_combat(ctx)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        member = ctx.message.author
+        character = self.bot.get_character(member.id)
+        if not character:
+            await ctx.send(combat.messages.render("no_player"))
+            return
+
+        if initiative is None:
+            initiative = self.bot.system.roll_initiative(character)
+
+        try:
+            combat.add(Combatant(character.name, character, initiative, member.id))
+        except DuplicateCombatantException as e:
+            await ctx.send(combat.messages.render("combat.duplicate", name=e.name))
+            return
+
+        await ctx.message.add_reaction("⚔️")
+
+    @combat.command()
+    @commands.has_any_role("DM")
+    async def npc(self, ctx: Context, name: str, number: int, *raw_attributes):
+        combat = self.get_combat(ctx)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        if not 0 < number <= self.MaxNPCs:
+            await ctx.send(
+                combat.messages.render("combat.npc_count", maximum=self.MaxNPCs)
+            )
+            return
+
+        attributes = []
+        for raw in raw_attributes:
+            try:
+                attributes.append(Attribute.from_str(raw))
+            except AttributeParseException as e:
+                await ctx.send(
+                    combat.messages.render("attribute_invalid", name=e.stat_name)
+                )
+                return
+            except (OverflowAttributeException, UnderflowAttributeException):
+                await ctx.send(combat.messages.render("attribute_invalid", name=raw))
+                return
+
+        if any(not attribute.name for attribute in attributes):
+            await ctx.send(combat.messages.render("attribute_format"))
+            return
+
+        for attribute in attributes:
+            attribute.spendable = True
+
+        # Either all of the NPCs join or none of them
+        names = [name] if number == 1 else [f"{name}{i}" for i in range(1, number + 1)]
+        for npc_name in names:
+            if combat.name_taken(npc_name):
+                await ctx.send(
+                    combat.messages.render("combat.duplicate", name=npc_name)
+                )
+                return
+
+        for npc_name in names:
+            # Every NPC gets its own copy of the attributes
+            stats = [copy.copy(attribute) for attribute in attributes]
+            character = Character(npc_name, stats)
+            initiative = self.bot.system.roll_initiative(character)
+            combat.add(Combatant(npc_name, character, initiative))
+
+        await ctx.message.add_reaction("⚔️")
+
+    @combat.command(name="next")
+    @commands.has_any_role("DM")
+    async def next_(self, ctx: Context):
+        combat = self.get_combat(ctx)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        combatant, new_round = combat.next_turn()
+        if new_round:
+            # Effects of the new round are part of the same message
+            summary = combat.summary()
+            effects = await self.bot.effects.round_passed(
+                ctx.channel.id, combat.messages
+            )
+            if effects:
+                summary = f"{summary}\n{effects}"
+
+            await ctx.send(summary)
+            combat.log = []
+
+        if not combatant:
+            await ctx.send(combat.messages.render("combat.nobody_left"))
+            return
+
+        mention = f" <@{combatant.user_id}>" if combatant.user_id else ""
+        await ctx.send(
+            combat.messages.render("combat.turn", name=combatant.name, mention=mention)
+        )
+
+    @combat.command()
+    @commands.has_any_role("DM")
+    async def damage(
+        self, ctx: Context, amount: int, attribute_name: str, *targets: str
+    ):
+        combat = self.get_combat(ctx)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        found: List[Combatant] = []
+        for target in targets:
+            matches = combat.find(target)
+            if not matches:
+                await ctx.send(
+                    combat.messages.render("combat.unknown_target", name=target)
+                )
+                return
+            found.extend(c for c in matches if c not in found)
+
+        changed = combat.apply_damage(found, amount, attribute_name)
+
+        # Player characters are persisted once per command, NPCs never
+        players = [c.user_id for c in changed if c.user_id is not None]
+        if players:
+            await self.bot.commit(*players)
+
+        await ctx.message.add_reaction("✅")
+
+    @combat.command()
+    async def status(self, ctx: Context):
+        combat = self.get_combat(ctx)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        await ctx.send(combat.summary())
+
+    @combat.command()
+    @commands.has_any_role("DM")
+    async def end(self, ctx: Context):
+        combat = self.combats.pop(ctx.channel.id, None)
+        if not combat:
+            await ctx.send(self.bot.messages(ctx.guild).render("combat.not_running"))
+            return
+
+        self.bot.effects.fight_ended(ctx.channel.id)
+
+        await ctx.send(combat.messages.render("combat.ended", summary=combat.summary()))
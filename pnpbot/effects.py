@@ -0,0 +1,408 @@
+import asyncio
+import heapq
+import logging
+
+from itertools import count
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from .character import (
+    Character,
+    NotSpendableException,
+    OverflowAttributeException,
+    UnderflowAttributeException,
+)
+from .messages import MessageCatalog
+from .ratelimit import RateLimitedCog
+
+if TYPE_CHECKING:
+    from .bot import PnPBot
+
+_logger = logging.getLogger("pnpbot")
+
+# Seconds per interval unit, rounds and rests are counted instead
+IntervalUnits = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_interval(text: str) -> Tuple[str, int]:
+    """Parses 30s, 5m, 1h, 2r (combat rounds) or rest into (kind, every)."""
+    text = text.lower()
+    if text == "rest":
+        return "rest", 1
+
+    number, unit = text[:-1], text[-1:]
+    every = int(number)
+    if every <= 0:
+        raise ValueError(text)
+
+    if unit == "r":
+        return "rounds", every
+    if unit in IntervalUnits:
+        return "seconds", every * IntervalUnits[unit]
+
+    raise ValueError(text)
+
+
+class Effect:
+    def __init__(
+        self,
+        user_id: int,
+        attribute: str,
+        amount: int,
+        interval: str,
+        times: Optional[int] = None,
+        channel_id: Optional[int] = None,
+    ):
+        self.user_id = user_id
+        self.attribute = attribute
+        self.amount = amount
+        self.interval = interval
+        self.kind, self.every = parse_interval(interval)
+        # None repeats until the effect is cleared
+        if times is not None and times < 1:
+            raise ValueError(times)
+        self.remaining = times
+        # Round based effects tick with the fight in this channel
+        self.channel_id = channel_id
+        self.cancelled = False
+
+
+def apply_effects(
+    characters: Dict[int, Character], effects: List[Effect], messages: MessageCatalog
+) -> Tuple[List[str], List[int]]:
+    """Applies all effects at once, returns the log lines and the changed players."""
+    lines = []
+    changed: List[int] = []
+    for effect in effects:
+        character = characters.get(effect.user_id)
+        stat = character.get_attribute(effect.attribute) if character else None
+        if not character or not stat:
+            effect.cancelled = True
+            continue
+
+        try:
+            if effect.amount >= 0:
+                character.gain(stat.name, effect.amount)
+            else:
+                character.spend(stat.name, -effect.amount)
+        except NotSpendableException:
+            effect.cancelled = True
+            lines.append(
+                messages.render(
+                    "effects.not_spendable", name=character.name, attribute=stat.name
+                )
+            )
+            continue
+        except UnderflowAttributeException as e:
+            character.update(stat.name, e.minium)
+        except OverflowAttributeException as e:
+            character.update(stat.name, e.maximum)
+
+        if effect.remaining is not None:
+            effect.remaining -= 1
+            effect.cancelled = effect.remaining <= 0
+
+        lines.append(
+            messages.render(
+                "effects.changed",
+                name=character.name,
+                amount=effect.amount,
+                attribute=stat.name,
+                value=stat,
+            )
+        )
+        if effect.user_id not in changed:
+            changed.append(effect.user_id)
+
+    return lines, changed
+
+
+class EffectScheduler:
+    """Applies over-time effects in batches.
+
+    Timed effects are kept in a heap ordered by due time, and a single timer is only
+    armed for the earliest of them. Round based effects wait in a heap per channel
+    until its fight advances, rest effects until the next rest.
+    """
+
+    def __init__(self, bot: "PnPBot"):
+        self.bot = bot
+        self._order = count()
+
+        # Heaps of (due, insertion order, effect), cancelled effects are skipped lazily
+        self.timed: List[Tuple[float, int, Effect]] = []
+        self.rounds: Dict[int, int] = {}
+        self.round_effects: Dict[int, List[Tuple[int, int, Effect]]] = {}
+        self.rest_effects: List[Effect] = []
+
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def effects(self) -> List[Effect]:
+        effects = [effect for _, _, effect in self.timed]
+        for heap in self.round_effects.values():
+            effects.extend(effect for _, _, effect in heap)
+        effects.extend(self.rest_effects)
+
+        return [effect for effect in effects if not effect.cancelled]
+
+    def add(self, effect: Effect):
+        if effect.kind == "seconds":
+            self._push_timed(effect, self.bot.loop.time() + effect.every)
+            self._arm()
+        elif effect.kind == "rounds":
+            assert effect.channel_id is not None
+            channel_id = effect.channel_id
+            self._push_round(effect, channel_id, self.rounds.get(channel_id, 0))
+        else:
+            self.rest_effects.append(effect)
+
+    def clear(self, user_id: int) -> int:
+        cleared = 0
+        for effect in self.effects():
+            if effect.user_id == user_id:
+                effect.cancelled = True
+                cleared += 1
+
+        self._purge()
+        return cleared
+
+    def _push_timed(self, effect: Effect, due: float):
+        heapq.heappush(self.timed, (due, next(self._order), effect))
+
+    def _push_round(self, effect: Effect, channel_id: int, current: int):
+        heap = self.round_effects.setdefault(channel_id, [])
+        heapq.heappush(heap, (current + effect.every, next(self._order), effect))
+
+    def _purge(self):
+        # Rebuilding is rare, but keeps a timer from firing for cancelled effects only
+        self.timed = [entry for entry in self.timed if not entry[2].cancelled]
+        heapq.heapify(self.timed)
+        for channel_id, heap in list(self.round_effects.items()):
+            heap[:] = [entry for entry in heap if not entry[2].cancelled]
+            heapq.heapify(heap)
+            if not heap:
+                del self.round_effects[channel_id]
+        self.rest_effects = [e for e in self.rest_effects if not e.cancelled]
+        self._arm()
+
+    def _arm(self):
+        while self.timed and self.timed[0][2].cancelled:
+            heapq.heappop(self.timed)
+
+        if not self.timed:
+            # Nothing scheduled, so no timer at all
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            return
+
+        due = self.timed[0][0]
+        if self.timer and self.timer.when() <= due:
+            return
+
+        if self.timer:
+            self.timer.cancel()
+        self.timer = self.bot.loop.call_at(due, self._tick)
+
+    def _apply(
+        self, effects: List[Effect], messages: MessageCatalog
+    ) -> Tuple[Optional[str], List[int]]:
+        lines, changed = apply_effects(self.bot.characters, effects, messages)
+        if not lines:
+            return None, changed
+
+        return "\n".join([messages.render("effects.applied")] + lines), changed
+
+    async def _announce(self, changed: List[int], message: Optional[str], channel):
+        try:
+            # All effects of a tick are persisted with a single write, before telling
+            if changed:
+                await self.bot.commit(*changed)
+        except Exception:
+            _logger.exception(f"Saving the effects of {len(changed)} players failed")
+            return
+
+        if message and channel:
+            await channel.send(message)
+
+    def _tick(self):
+        self.timer = None
+        now = self.bot.loop.time()
+
+        due = []
+        while self.timed and self.timed[0][0] <= now:
+            _, _, effect = heapq.heappop(self.timed)
+            if not effect.cancelled:
+                due.append(effect)
+
+        channel = self.bot.play_channel
+        message: Optional[str] = None
+        changed: List[int] = []
+        try:
+            message, changed = self._apply(
+                due, self.bot.messages(channel and channel.guild)
+            )
+        except Exception:
+            # A failed tick must not stop the timer for every later effect
+            _logger.exception("Applying %d effects failed", len(due))
+        finally:
+            for effect in due:
+                if not effect.cancelled:
+                    self._push_timed(effect, now + effect.every)
+            self._arm()
+
+        if changed or message:
+            self.bot.loop.create_task(self._announce(changed, message, channel))
+
+    async def round_passed(
+        self, channel_id: int, messages: MessageCatalog
+    ) -> Optional[str]:
+        current = self.rounds[channel_id] = self.rounds.get(channel_id, 0) + 1
+        heap = self.round_effects.get(channel_id)
+        if not heap:
+            return None
+
+        due = []
+        while heap and heap[0][0] <= current:
+            _, _, effect = heapq.heappop(heap)
+            if not effect.cancelled:
+                due.append(effect)
+
+        message, changed = self._apply(due, messages)
+        for effect in due:
+            if not effect.cancelled:
+                self._push_round(effect, channel_id, current)
+
+        if changed:
+            await self.bot.commit(*changed)
+        return message
+
+    def fight_ended(self, channel_id: int):
+        # Round based effects end with the fight
+        self.rounds.pop(channel_id, None)
+        for _, _, effect in self.round_effects.pop(channel_id, []):
+            effect.cancelled = True
+
+    async def rest(self, messages: MessageCatalog) -> Optional[str]:
+        effects = self.rest_effects
+        message, changed = self._apply(effects, messages)
+        self.rest_effects = [effect for effect in effects if not effect.cancelled]
+
+        if changed:
+            await self.bot.commit(*changed)
+        return message
+
+    def close(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+
+class EffectsCog(RateLimitedCog):
+    @commands.group()
+    async def effect(self, ctx: Context):
+        if ctx.invoked_subcommand is None:
+            await ctx.send(self.bot.messages(ctx.guild).render("effects.usage"))
+
+    @effect.command()
+    @commands.has_any_role("DM")
+    async def add(
+        self,
+        ctx: Context,
+        player: str,
+        amount: int,
+        attribute_name: str,
+        interval: str,
+        times: Optional[int] = None,
+    ):
+        messages = self.bot.messages(ctx.guild)
+        member = ctx.guild.get_member_named(player)
+        if not member:
+            await ctx.send(messages.render("player_not_found", player=player))
+            return
+
+        character = self.bot.get_character(member.id)
+        if not character:
+            await ctx.send(messages.render("player_has_no_character", player=player))
+            return
+
+        stat = character.get_attribute(attribute_name)
+        if not stat:
+            await ctx.send(
+                messages.render(
+                    "attribute_not_found", character=character.name, name=attribute_name
+                )
+            )
+            return
+
+        if not stat.spendable:
+            await ctx.send(messages.render("attribute_not_spendable", name=stat.name))
+            return
+
+        try:
+            effect = Effect(
+                member.id, stat.name, amount, interval, times, ctx.channel.id
+            )
+        except ValueError:
+            await ctx.send(messages.render("effects.usage"))
+            return
+
+        # Round based effects only tick while a fight in this channel advances
+        combat_cog = self.bot.get_cog("CombatCog")
+        if effect.kind == "rounds" and ctx.channel.id not in combat_cog.combats:
+            await ctx.send(messages.render("effects.no_fight"))
+            return
+
+        self.bot.effects.add(effect)
+        await ctx.send(
+            messages.render(
+                "effects.added",
+                name=character.name,
+                amount=amount,
+                attribute=stat.name,
+                interval=interval,
+            )
+        )
+
+    @effect.command(name="list")
+    async def list_(self, ctx: Context):
+        messages = self.bot.messages(ctx.guild)
+        lines = []
+        for effect in self.bot.effects.effects():
+            character = self.bot.get_character(effect.user_id)
+            if not character:
+                continue
+
+            lines.append(
+                messages.render(
+                    "effects.entry",
+                    name=character.name,
+                    amount=effect.amount,
+                    attribute=effect.attribute,
+                    interval=effect.interval,
+                    remaining="∞" if effect.remaining is None else effect.remaining,
+                )
+            )
+
+        await ctx.send("\n".join(lines) or messages.render("effects.none"))
+
+    @effect.command()
+    @commands.has_any_role("DM")
+    async def clear(self, ctx: Context, player: str):
+        messages = self.bot.messages(ctx.guild)
+        member = ctx.guild.get_member_named(player)
+        if not member:
+            await ctx.send(messages.render("player_not_found", player=player))
+            return
+
+        cleared = self.bot.effects.clear(member.id)
+        await ctx.send(messages.render("effects.cleared", count=cleared, name=player))
+
+    @effect.command()
+    @commands.has_any_role("DM")
+    async def rest(self, ctx: Context):
+        messages = self.bot.messages(ctx.guild)
+        message = await self.bot.effects.rest(messages)
+        await ctx.send(message or messages.render("effects.none"))
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+_logger = logging.getLogger("pnpbot")
+
+
+class ComputeQueueFullException(Exception):
+    def __init__(self, pending: int):
+        super().__init__()
+        self.pending = pending
+
+
+class ComputeBusyException(Exception):
+    def __init__(self, user_id: int):
+        super().__init__()
+        self.user_id = user_id
+
+
+class ComputeTimeoutException(Exception):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+
+
+class ComputeFailedException(Exception):
+    pass
+
+
+class ComputeExecutor:
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 8,
+        max_per_user: int = 1,
+        timeout: float = 10.0,
+        cache_size: int = 256,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.timeout = timeout
+        self.cache_size = cache_size
+
+        self.pending = 0
+        self.per_user: Dict[int, int] = {}
+        self.cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+        # The pool is only spawned once the first heavy computation comes in
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        return self._pool
+
+    def _cache_get(self, key: Hashable) -> Tuple[bool, Any]:
+        if key not in self.cache:
+            return False, None
+
+        self.cache.move_to_end(key)
+        return True, self.cache[key]
+
+    def _cache_put(self, key: Hashable, value: Any):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def submit(self, user_id: int, func: Callable, *args: Hashable) -> Any:
+        key = (func.__module__, func.__qualname__, args)
+        hit, value = self._cache_get(key)
+        if hit:
+            return value
+
+        if self.pending >= self.max_pending:
+            raise ComputeQueueFullException(self.pending)
+
+        if self.per_user.get(user_id, 0) >= self.max_per_user:
+            raise ComputeBusyException(user_id)
+
+        self.pending += 1
+        self.per_user[user_id] = self.per_user.get(user_id, 0) + 1
+
+        try:
+            value = await self._run(func, *args)
+        finally:
+            self.pending -= 1
+            self.per_user[user_id] -= 1
+            if not self.per_user[user_id]:
+                del self.per_user[user_id]
+
+        self._cache_put(key, value)
+        return value
+
+    async def _run(self, func: Callable, *args: Hashable) -> Any:
+        loop = asyncio.get_event_loop()
+        for attempt in range(2):
+            pool = self.pool
+            future = loop.run_in_executor(pool, func, *args)
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                # Cancelling doesn't stop a running job, so its worker has to go
+                _logger.warning(f"Computation {func.__qualname__}{args} timed out")
+                self._kill_pool()
+                raise ComputeTimeoutException(self.timeout)
+            except BrokenProcessPool:
+                # Killed for another job's timeout or a crashed worker, a broken pool
+                # never recovers, so retry once on a fresh one
+                _logger.warning(
+                    f"Computation {func.__qualname__}{args} lost its worker"
+                )
+                if self._pool is pool:
+                    self._kill_pool()
+                if attempt:
+                    raise ComputeFailedException()
+
+    def _kill_pool(self):
+        if self._pool is None:
+            return
+
+        for process in list((self._pool._processes or {}).values()):  # type: ignore
+            process.terminate()
+        self._pool.shutdown(wait=False)
+        self._pool = None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
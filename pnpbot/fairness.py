@@ -0,0 +1,270 @@
+import asyncio
+import math
+import random
+import time
+
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .messages import MessageCatalog, get_catalog
+from .systems.base import BaseSystem, Dice, outcome_key
+from .systems.dsa import check_probability
+
+OutcomeKeys = ["critical_success", "success", "failure", "critical_failure"]
+
+# Generators a system can roll with, created from an optional seed
+RngBackends: Dict[str, Callable[[Optional[int]], random.Random]] = {
+    "mersenne": random.Random,
+    "system": lambda seed: random.SystemRandom(),
+}
+
+
+class FakeBot:
+    def __init__(self, messages: MessageCatalog):
+        self._messages = messages
+
+    def messages(self, guild) -> MessageCatalog:
+        return self._messages
+
+
+class FakeAuthor:
+    id = 0
+    mention = "<@0>"
+
+
+class FakeContext:
+    """Just enough of a command context to drive a system's handle_roll."""
+
+    def __init__(self, messages: Optional[MessageCatalog] = None):
+        self.bot = FakeBot(messages or get_catalog())
+        self.author = FakeAuthor()
+        self.guild = None
+        self.sent: List[str] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        self.sent.append(content or "")
+
+
+class RecordingRandom(random.Random):
+    """Draws from another generator and counts every face it hands out."""
+
+    def __init__(self, rng: random.Random, faces: Counter):
+        super().__init__()
+        self.rng = rng
+        self.faces = faces
+
+    def choices(self, population, weights=None, *, cum_weights=None, k=1):
+        results = self.rng.choices(population, weights, cum_weights=cum_weights, k=k)
+        self.faces.update(results)
+        return results
+
+
+class StatisticResult(NamedTuple):
+    statistic: float
+    p_value: float
+
+
+class FairnessReport(NamedTuple):
+    backend: str
+    rolls: int
+    seconds: float
+    faces: StatisticResult
+    faces_ks: StatisticResult
+    outcomes: StatisticResult
+    outcome_counts: Dict[str, int]
+    expected_outcomes: Dict[str, float]
+
+    @property
+    def rolls_per_second(self) -> float:
+        return self.rolls / self.seconds if self.seconds else math.inf
+
+
+def gamma_q(a: float, x: float) -> float:
+    """Regularized upper incomplete gamma function Q(a, x)."""
+    if x <= 0:
+        return 1.0
+
+    prefix = math.exp(-x + a * math.log(x) - math.lgamma(a))
+    if x < a + 1:
+        # Series expansion of P(a, x)
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - prefix * total)
+
+    # Continued fraction for Q(a, x), evaluated with the modified Lentz method
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+
+    return prefix * h
+
+
+def chi_square(
+    observed: Sequence[int], probabilities: Sequence[float]
+) -> StatisticResult:
+    total = sum(observed)
+    statistic = 0.0
+    categories = 0
+    for count, probability in zip(observed, probabilities):
+        if probability == 0:
+            # An impossible outcome happened, no need for statistics
+            if count:
+                return StatisticResult(math.inf, 0.0)
+            continue
+
+        expected = total * probability
+        statistic += (count - expected) ** 2 / expected
+        categories += 1
+
+    if categories < 2:
+        return StatisticResult(0.0, 1.0)
+
+    return StatisticResult(statistic, gamma_q((categories - 1) / 2, statistic / 2))
+
+
+def kolmogorov_smirnov(
+    observed: Sequence[int], probabilities: Sequence[float]
+) -> StatisticResult:
+    """KS test of ordered categories; conservative for discrete distributions."""
+    total = sum(observed)
+    if not total:
+        return StatisticResult(0.0, 1.0)
+
+    distance = observed_cdf = expected_cdf = 0.0
+    for count, probability in zip(observed, probabilities):
+        observed_cdf += count / total
+        expected_cdf += probability
+        distance = max(distance, abs(observed_cdf - expected_cdf))
+
+    root = math.sqrt(total)
+    scale = (root + 0.12 + 0.11 / root) * distance
+    if scale < 0.2:
+        return StatisticResult(distance, 1.0)
+
+    p_value = 2 * sum(
+        (-1) ** (k - 1) * math.exp(-2 * k * k * scale * scale) for k in range(1, 101)
+    )
+    return StatisticResult(distance, min(1.0, max(0.0, p_value)))
+
+
+def hexdec_outcomes(dice: Dice, base: int) -> Dict[str, float]:
+    # Only three facts about each die matter, so track their combinations die by die
+    face = 1 / dice.sides
+    states = {(False, False, False): 1.0}
+    for _ in range(dice.number):
+        next_states: Dict[Tuple[bool, bool, bool], float] = defaultdict(float)
+        for (success, twenty, one), probability in states.items():
+            for r in range(1, dice.sides + 1):
+                state = (success or r > base, twenty or r == 20, one or r == 1)
+                next_states[state] += probability * face
+        states = next_states
+
+    outcomes = dict.fromkeys(OutcomeKeys, 0.0)
+    for (success, twenty, one), probability in states.items():
+        critical = twenty or (one and not success)
+        outcomes[outcome_key(success, critical)] += probability
+
+    return outcomes
+
+
+def dsa_outcomes(dice: Dice, base1: int, base2: int, base3: int, talent: int):
+    if dice.number != 3:
+        raise ValueError("Only single DSA talent checks report an outcome")
+
+    success, critical_success, critical_failure = check_probability(
+        (base1, base2, base3), talent, dice.sides
+    )
+    return {
+        "critical_success": critical_success,
+        "success": success - critical_success,
+        "failure": 1 - success - critical_failure,
+        "critical_failure": critical_failure,
+    }
+
+
+ExpectedOutcomes: Dict[str, Callable[..., Dict[str, float]]] = {
+    "hexdec": hexdec_outcomes,
+    "dsa": dsa_outcomes,
+}
+
+
+def benchmark_backend(
+    backend: str, dice: Dice, rolls: int, seed: Optional[int] = None
+) -> float:
+    """Returns rolls per second of the bare generator, without the roll path."""
+    rng = RngBackends[backend](seed)
+    faces = range(1, dice.sides + 1)
+    start = time.perf_counter()
+    for _ in range(rolls):
+        rng.choices(faces, k=dice.number)
+
+    return rolls / (time.perf_counter() - start)
+
+
+def run_fairness(
+    system_name: str,
+    system: BaseSystem,
+    backend: str,
+    rolls: int,
+    dice: Dice,
+    *args,
+    seed: Optional[int] = None,
+) -> FairnessReport:
+    """Rolls through system.handle_roll and tests the faces and outcomes it produced."""
+    expected = ExpectedOutcomes[system_name](dice, *args)
+
+    # The system rolls with the recording generator it is given, the roll path is untouched
+    faces: Counter = Counter()
+    system.rng = RecordingRandom(RngBackends[backend](seed), faces)
+
+    ctx = FakeContext()
+    outcome_texts = {ctx.bot.messages(None).render(key): key for key in OutcomeKeys}
+    outcomes: Counter = Counter()
+
+    async def roll_all():
+        for _ in range(rolls):
+            await system.handle_roll(ctx, None, dice, *args)
+
+            # The outcome is the second line of every single roll result
+            outcomes[outcome_texts[ctx.sent[0].split("\n")[1]]] += 1
+            ctx.sent.clear()
+
+    loop = asyncio.new_event_loop()
+    try:
+        start = time.perf_counter()
+        loop.run_until_complete(roll_all())
+        seconds = time.perf_counter() - start
+    finally:
+        loop.close()
+
+    face_counts = [faces[r] for r in range(1, dice.sides + 1)]
+    uniform = [1 / dice.sides] * dice.sides
+    return FairnessReport(
+        backend=backend,
+        rolls=rolls,
+        seconds=seconds,
+        faces=chi_square(face_counts, uniform),
+        faces_ks=kolmogorov_smirnov(face_counts, uniform),
+        outcomes=chi_square(
+            [outcomes[key] for key in OutcomeKeys],
+            [expected[key] for key in OutcomeKeys],
+        ),
+        outcome_counts=dict(outcomes),
+        expected_outcomes=expected,
+    )
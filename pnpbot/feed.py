@@ -0,0 +1,231 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from .character import Attribute, Character
+
+_logger = logging.getLogger("pnpbot")
+
+
+AttributeState = Tuple[str, int, int, int, bool, int]
+
+# Answers a request an observer sent over the socket
+RequestHandler = Callable[[dict], Awaitable[dict]]
+
+
+def attribute_state(stat: Attribute) -> AttributeState:
+    return (
+        stat.name,
+        stat.value,
+        stat.minimum,
+        stat.maximum,
+        stat.limited,
+        stat.version,
+    )
+
+
+def attribute_states(character: Character) -> Dict[str, AttributeState]:
+    return {key: attribute_state(stat) for key, stat in character.attributes.items()}
+
+
+def encode_attributes(states: Dict[str, AttributeState]) -> Dict[str, dict]:
+    return {
+        name: {
+            "value": value,
+            "minimum": minimum,
+            "maximum": maximum,
+            "limited": limited,
+            "version": version,
+        }
+        for name, value, minimum, maximum, limited, version in states.values()
+    }
+
+
+class ChangeFeed:
+    """Streams character changes to observers on a Unix socket.
+
+    Observers may query changes, but patch requests change characters, so they
+    are only answered when they carry the patch token the bot was started with.
+    """
+
+    def __init__(
+        self,
+        max_backlog: int = 1000,
+        request_handler: Optional[RequestHandler] = None,
+        patch_token: Optional[str] = None,
+    ):
+        self.max_backlog = max_backlog
+        self.request_handler = request_handler
+        self.patch_token = patch_token
+        self.sequence = 0
+
+        # Last published state per character, so only changed attributes are sent
+        self.names: Dict[int, str] = {}
+        self.versions: Dict[int, int] = {}
+        self.states: Dict[int, Dict[str, AttributeState]] = {}
+        self.subscribers: Set[asyncio.Queue] = set()
+
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def reset(self, characters: Dict[int, Character]):
+        self.names = {user_id: c.name for user_id, c in characters.items()}
+        self.versions = {user_id: c.version for user_id, c in characters.items()}
+        self.states = {
+            user_id: attribute_states(c) for user_id, c in characters.items()
+        }
+
+        # Observers connected before the characters were loaded replace their state
+        self.publish(self.snapshot())
+
+    def snapshot(self) -> dict:
+        return {
+            "type": "snapshot",
+            "seq": self.sequence,
+            "characters": {
+                user_id: {
+                    "name": self.names[user_id],
+                    "version": self.versions[user_id],
+                    "attributes": encode_attributes(states),
+                }
+                for user_id, states in self.states.items()
+            },
+        }
+
+    def publish(self, event: dict):
+        self.sequence += 1
+        event["seq"] = self.sequence
+
+        for queue in list(self.subscribers):
+            if queue.qsize() >= self.max_backlog:
+                # Slow observers are dropped, they resync with a fresh snapshot
+                _logger.warning("Dropping change feed observer that fell behind")
+                self.subscribers.discard(queue)
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(event)
+
+    def character_updated(self, user_id: int, character: Character):
+        old = self.states.get(user_id, {})
+        new = attribute_states(character)
+        self.states[user_id] = new
+
+        changed = {key: state for key, state in new.items() if old.get(key) != state}
+        removed = [old[key][0] for key in old if key not in new]
+        if not changed and not removed and self.names.get(user_id) == character.name:
+            return
+
+        self.names[user_id] = character.name
+        self.versions[user_id] = character.version
+        self.publish(
+            {
+                "type": "update",
+                "player": user_id,
+                "name": character.name,
+                "version": character.version,
+                "attributes": encode_attributes(changed),
+                "removed": removed,
+            }
+        )
+
+    def character_deleted(self, user_id: int):
+        self.names.pop(user_id, None)
+        self.versions.pop(user_id, None)
+        if self.states.pop(user_id, None) is not None:
+            self.publish({"type": "delete", "player": user_id})
+
+    def subscribe(self) -> Tuple[dict, asyncio.Queue]:
+        # No await in between, so no event can slip between snapshot and subscription
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.add(queue)
+        return self.snapshot(), queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def authorized(self, request: dict) -> bool:
+        token = request.get("token")
+        if self.patch_token is None or not isinstance(token, str):
+            return False
+
+        return hmac.compare_digest(token.encode(), self.patch_token.encode())
+
+    async def answer(self, request: dict) -> dict:
+        if self.request_handler is None:
+            response = {"type": "error", "error": "read_only"}
+        elif request.get("type") == "patch" and not self.authorized(request):
+            response = {"type": "error", "error": "unauthorized"}
+        else:
+            try:
+                response = await self.request_handler(request)
+            except Exception:
+                request = {key: request[key] for key in request if key != "token"}
+                _logger.exception(f"Change feed request {request} failed")
+                response = {"type": "error", "error": "internal"}
+
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    async def read_requests(self, reader: asyncio.StreamReader, queue: asyncio.Queue):
+        # Answers go through the queue, so they are written in order with the events
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+
+                if isinstance(request, dict):
+                    queue.put_nowait(await self.answer(request))
+                else:
+                    queue.put_nowait({"type": "error", "error": "invalid_request"})
+        finally:
+            # Wakes the writer once the observer hung up, even if no event follows
+            queue.put_nowait(None)
+
+    async def handle_observer(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        snapshot, queue = self.subscribe()
+        requests = asyncio.ensure_future(self.read_requests(reader, queue))
+        try:
+            writer.write(json.dumps(snapshot).encode("utf-8") + b"\n")
+            await writer.drain()
+
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+
+                writer.write(json.dumps(event).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            requests.cancel()
+            self.unsubscribe(queue)
+            writer.close()
+
+    async def serve(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+
+        self.server = await asyncio.start_unix_server(self.handle_observer, path)
+        _logger.info(f"Change feed listening on {path}")
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+        self.subscribers.clear()
@@ -0,0 +1,259 @@
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Tuple, Union
+
+DefaultLocale = "de"
+
+# A message is either a template or a (singular, plural) pair chosen by 'count'
+Message = Union[str, Tuple[str, str]]
+
+Catalogs: Dict[str, Dict[str, Message]] = {
+    "de": {
+        "player_not_found": "Spieler '{player}' nicht gefunden!",
+        "no_player": "Spieler nicht gefunden!",
+        "character_not_found": "Charakter nicht gefunden!",
+        "player_has_no_character": "Spieler '{player}' hat keinen Charakter!",
+        "player_has_character": "Der Spieler {player} hat schon einen Charakter ({name})!",
+        "character_added": "Charakter für '{player}' ({id}) hinzugefügt!",
+        "character_announced": "Charakter '{name}' hinzugefügt!\n{character}",
+        "character_deleted": "Spieler '{player}' ({id}) gelöscht!",
+        "attribute_format": "Alle Attribute müssen im Format _name=wert/maximum_ (z.B. Stärke=5/12) angegeben werden!",
+        "attribute_anonymous": "Attribut ohne Namen!",
+        "attribute_invalid": "Fehler im Attribut '{name}'!",
+        "attribute_invalid_format": "Attribute müssen im Format name=wert/maximum angegeben werden!",
+        "attribute_unknown": "Unbekanntes Attribut '{name}'!",
+        "attribute_missing": "Folgende Attribute fehlen: {names}!",
+        "attribute_not_found": "Der Charakter {character} hat kein Attribut namens '{name}'!",
+        "attribute_not_spendable": "Das Attribut {name} kann man nicht ausgeben!",
+        "attribute_underflow": "Du hast nur noch {current} {name} und kannst nicht unter {minimum} sein!",
+        "set_value_format": "Der Wert muss entweder eine Zahl oder im Format x/y (z.B. 5/8) sein.",
+        "set_usage": "Verwendung: !set *player* *attributname*=*wert* (z.B.: !set MyPlayer intelligenz=5, !set MyPlayer hp=3/12",
+        "set_done": ":bust_in_silhouette: {character} hat jetzt :clipboard: **{value} {name}**.",
+        "spend_done": ":bust_in_silhouette: {character} :clipboard: :arrow_lower_right: **{value} {name}**",
+        "gain_done": ":bust_in_silhouette: {character} :clipboard: :arrow_upper_right: **{value} {name}**",
+        "import_attach": "Bitte eine CSV- oder JSONL-Datei anhängen!",
+        "import_format": "Nur CSV- und JSONL-Dateien können importiert werden!",
+        "import_done": "{imported} Charaktere importiert, {errors} Fehler.",
+        "import_more_errors": "... und {count} weitere",
+        "import_row_error": "Zeile {line}{player}: {message}",
+        "import_duplicate": "Spieler hat schon einen Charakter!",
+        "import_invalid_row": "Ungültige Zeile!",
+        "import_missing_columns": "Spalten 'player' und 'name' fehlen!",
+        "import_version_conflict": "Der Charakter wurde seit Version {expected} geändert (jetzt {actual})!",
+        "export_usage": "Verwendung: !export [csv|jsonl]",
+        "language_usage": "Verwendung: !language [{locales}]",
+        "language_done": "Sprache auf Deutsch umgestellt.",
+        "compute_busy": "Deine letzte Berechnung läuft noch, bitte warte kurz.",
+        "compute_full": "Zu viele Berechnungen gleichzeitig, versuch es später nochmal.",
+        "compute_timeout": "Die Berechnung hat länger als {timeout:g}s gedauert und wurde abgebrochen.",
+        "compute_failed": "Die Berechnung ist fehlgeschlagen, bitte versuch es nochmal.",
+        "odds_unsupported": "Das System {system} kann keine Wahrscheinlichkeiten berechnen.",
+        "profile_usage": "Verwendung: !profile *sekunden* (höchstens {maximum})",
+        "profile_running": "Es läuft schon eine Messung.",
+        "profile_done": "Messung über {duration:.1f}s, {busy} von {samples} Stichproben beschäftigt. Heißeste Funktionen (eigene/gesamt):",
+        "profile_line": "`{own:>5} {total:>5}` {function}",
+        "profile_slow": (
+            "{count} Callback hat die Schleife blockiert:",
+            "{count} Callbacks haben die Schleife blockiert:",
+        ),
+        "roll_help": "Verwendung: !roll XdY",
+        "roll_usage": "Verwendung: !roll XdY Basis (e.g. `!roll 3d20 15`",
+        "roll_max_dice": "Du kannst maximal {count} Würfel gleichzeitig werfen.",
+        "roll_max_sides": "Die Würfel können nicht mehr als 100 Seiten haben.",
+        "roll_result": ">>> {mention}\n{outcome}\n:game_die: {dice} ({successes})",
+        "critical_success": ":fire: :fire: :fire: **Kritischer Erfolg!** :fire: :fire: :fire:",
+        "success": ":green_circle: **Erfolg!**",
+        "critical_failure": ":zap: :zap: :zap: **Kritischer Misserfolg!** :zap: :zap: :zap:",
+        "failure": ":red_circle: **Misserfolg!**",
+        "successes": ("{count} Erfolg", "{count} Erfolge"),
+        "dsa.roll_help": "Verwendung: !roll XdY BasisWert BasisWert BasisWert TalentWert  (z.B. `!roll 3d20 10 11 12 5`)\n"
+        "Für mehrere Proben auf einmal ein Vielfaches von 3 Würfeln werfen (z.B. `!roll 12d20 10 11 12 5` für 4 Proben)\n"
+        "Mit Eigenschaften statt Werten gelten die Werte vom Charakterbogen, mit Spielern dahinter für jeden von ihnen (z.B. `!roll 3d20 KL IN IN 5 Alrik Boron`)",
+        "dsa.odds_help": "Verwendung: !odds BasisWert BasisWert BasisWert TalentWert [Seiten]  (z.B. `!odds 10 11 12 5`)",
+        "dsa.three_dice": "Eine Talentprobe braucht genau 3 Würfel pro Probe.",
+        "dsa.max_checks": "Du kannst maximal {count} Proben gleichzeitig würfeln.",
+        "dsa.check_result": ">>> {mention}\n{outcome}\n:game_die: {dice} ({successes}) {talent}TaW",
+        "dsa.check_table": ">>> {mention}\n:game_die: {passed}/{total} Proben bestanden ({base})\n```\n{table}\n```",
+        "dsa.check_table_header": "{label} | Würfe    | Erg. | TaW | Krit",
+        "dsa.odds_result": ">>> {mention}\n:abacus: Erfolg: **{success:.1%}** (kritisch: {critical_success:.1%}), kritischer Misserfolg: {critical_failure:.1%}",
+        "hexdec.roll_help": "Verwendung: !roll XdY Basis (z.B. `!roll 3d20 15`)",
+        "combat.usage": "Verwendung: !combat start|join|npc|next|damage|status|end",
+        "combat.running": "In diesem Kanal läuft schon ein Kampf!",
+        "combat.not_running": "In diesem Kanal läuft kein Kampf!",
+        "combat.started": ":crossed_swords: Ein Kampf beginnt! Mit `!combat join` beitreten.",
+        "combat.nobody_left": "Niemand ist mehr kampffähig!",
+        "combat.turn": ":arrow_forward: {name}{mention} ist am Zug.",
+        "combat.unknown_target": "Kein Kampfteilnehmer namens '{name}'!",
+        "combat.ended": "{summary}\n:checkered_flag: Der Kampf ist vorbei!",
+        "combat.round": ":crossed_swords: **Runde {round}**",
+        "combat.order": "Reihenfolge: {order}",
+        "combat.last_round": "Letzte Runde:",
+        "combat.no_attribute": "{name} hat kein Attribut '{attribute}'",
+        "combat.not_spendable": "{name}: {attribute} kann man nicht ausgeben",
+        "combat.changed": "{name}: {amount:+d} {attribute} → {value}",
+        "combat.defeated": ":skull: {name} ist kampfunfähig",
+        "combat.revived": ":adhesive_bandage: {name} ist wieder kampffähig",
+        "combat.npc_count": "Es können 1 bis {maximum} NSCs auf einmal hinzukommen!",
+        "combat.duplicate": "Es gibt schon einen Kampfteilnehmer namens '{name}'!",
+        "effects.usage": "Verwendung: !effect add *spieler* *menge* *attribut* *intervall* [*anzahl*], !effect list, !effect clear *spieler*, !effect rest (Intervall z.B. 30s, 5m, 1h, 2r für Kampfrunden oder rest)",
+        "effects.added": "Effekt für {name}: {amount:+d} {attribute} alle {interval}.",
+        "effects.none": "Keine Effekte aktiv.",
+        "effects.entry": "{name}: {amount:+d} {attribute} alle {interval}, noch {remaining}",
+        "effects.cleared": (
+            "{count} Effekt von {name} entfernt.",
+            "{count} Effekte von {name} entfernt.",
+        ),
+        "effects.applied": ":hourglass: Effekte:",
+        "effects.changed": "{name}: {amount:+d} {attribute} → {value}",
+        "effects.not_spendable": "{name}: {attribute} kann man nicht ändern, Effekt entfernt",
+        "effects.no_fight": "Hier läuft kein Kampf, Effekte in Kampfrunden brauchen einen.",
+    },
+    "en": {
+        "player_not_found": "Player '{player}' not found!",
+        "no_player": "Player not found!",
+        "character_not_found": "Character not found!",
+        "player_has_no_character": "Player '{player}' has no character!",
+        "player_has_character": "Player {player} already has a character ({name})!",
+        "character_added": "Added character for '{player}' ({id})!",
+        "character_announced": "Character '{name}' added!\n{character}",
+        "character_deleted": "Deleted player '{player}' ({id})!",
+        "attribute_format": "All attributes have to be given as _name=value/maximum_ (e.g. Strength=5/12)!",
+        "attribute_anonymous": "Attribute without a name!",
+        "attribute_invalid": "Invalid attribute '{name}'!",
+        "attribute_invalid_format": "Attributes have to be given as name=value/maximum!",
+        "attribute_unknown": "Unknown attribute '{name}'!",
+        "attribute_missing": "The following attributes are missing: {names}!",
+        "attribute_not_found": "The character {character} has no attribute called '{name}'!",
+        "attribute_not_spendable": "The attribute {name} can't be spent!",
+        "attribute_underflow": "You only have {current} {name} left and can't go below {minimum}!",
+        "set_value_format": "The value has to be a number or in the format x/y (e.g. 5/8).",
+        "set_usage": "Usage: !set *player* *attribute*=*value* (e.g.: !set MyPlayer intelligence=5, !set MyPlayer hp=3/12",
+        "set_done": ":bust_in_silhouette: {character} now has :clipboard: **{value} {name}**.",
+        "import_attach": "Please attach a CSV or JSONL file!",
+        "import_format": "Only CSV and JSONL files can be imported!",
+        "import_done": "Imported {imported} characters, {errors} errors.",
+        "import_more_errors": "... and {count} more",
+        "import_row_error": "Line {line}{player}: {message}",
+        "import_duplicate": "Player already has a character!",
+        "import_invalid_row": "Invalid line!",
+        "import_missing_columns": "Columns 'player' and 'name' are missing!",
+        "import_version_conflict": "The character changed since version {expected} (now {actual})!",
+        "export_usage": "Usage: !export [csv|jsonl]",
+        "language_usage": "Usage: !language [{locales}]",
+        "language_done": "Language switched to English.",
+        "compute_busy": "Your last calculation is still running, please wait.",
+        "compute_full": "Too many calculations at once, please try again later.",
+        "compute_timeout": "The calculation took longer than {timeout:g}s and was cancelled.",
+        "compute_failed": "The calculation failed, please try again.",
+        "odds_unsupported": "The system {system} can't calculate odds.",
+        "profile_usage": "Usage: !profile *seconds* (at most {maximum})",
+        "profile_running": "A profile is already running.",
+        "profile_done": "Profiled {duration:.1f}s, {busy} of {samples} samples busy. Hottest functions (own/total):",
+        "profile_slow": (
+            "{count} callback blocked the loop:",
+            "{count} callbacks blocked the loop:",
+        ),
+        "roll_help": "Usage: !roll XdY",
+        "roll_usage": "Usage: !roll XdY base (e.g. `!roll 3d20 15`",
+        "roll_max_dice": "You can roll at most {count} dice at once.",
+        "roll_max_sides": "Dice can't have more than 100 sides.",
+        "critical_success": ":fire: :fire: :fire: **Critical success!** :fire: :fire: :fire:",
+        "success": ":green_circle: **Success!**",
+        "critical_failure": ":zap: :zap: :zap: **Critical failure!** :zap: :zap: :zap:",
+        "failure": ":red_circle: **Failure!**",
+        "successes": ("{count} success", "{count} successes"),
+        "dsa.roll_help": "Usage: !roll XdY base base base skill  (e.g. `!roll 3d20 10 11 12 5`)\n"
+        "Roll a multiple of 3 dice for several checks at once (e.g. `!roll 12d20 10 11 12 5` for 4 checks)\n"
+        "Name attributes instead of values to use the character sheet, followed by players to check each of them (e.g. `!roll 3d20 KL IN IN 5 Alrik Boron`)",
+        "dsa.odds_help": "Usage: !odds base base base skill [sides]  (e.g. `!odds 10 11 12 5`)",
+        "dsa.three_dice": "A skill check needs exactly 3 dice per check.",
+        "dsa.max_checks": "You can roll at most {count} checks at once.",
+        "dsa.check_table": ">>> {mention}\n:game_die: {passed}/{total} checks passed ({base})\n```\n{table}\n```",
+        "dsa.check_table_header": "{label} | Rolls    | Res. | TaW | Crit",
+        "dsa.odds_result": ">>> {mention}\n:abacus: Success: **{success:.1%}** (critical: {critical_success:.1%}), critical failure: {critical_failure:.1%}",
+        "hexdec.roll_help": "Usage: !roll XdY base (e.g. `!roll 3d20 15`)",
+        "combat.usage": "Usage: !combat start|join|npc|next|damage|status|end",
+        "combat.running": "There already is a fight in this channel!",
+        "combat.not_running": "There is no fight in this channel!",
+        "combat.started": ":crossed_swords: A fight begins! Join with `!combat join`.",
+        "combat.nobody_left": "Nobody is able to fight anymore!",
+        "combat.turn": ":arrow_forward: {name}{mention}, it's your turn.",
+        "combat.unknown_target": "No combatant called '{name}'!",
+        "combat.ended": "{summary}\n:checkered_flag: The fight is over!",
+        "combat.round": ":crossed_swords: **Round {round}**",
+        "combat.order": "Order: {order}",
+        "combat.last_round": "Last round:",
+        "combat.no_attribute": "{name} has no attribute '{attribute}'",
+        "combat.not_spendable": "{name}: {attribute} can't be spent",
+        "combat.defeated": ":skull: {name} is down",
+        "combat.revived": ":adhesive_bandage: {name} is back up",
+        "combat.npc_count": "You can add 1 to {maximum} NPCs at once!",
+        "combat.duplicate": "There already is a combatant called '{name}'!",
+        "effects.usage": "Usage: !effect add *player* *amount* *attribute* *interval* [*times*], !effect list, !effect clear *player*, !effect rest (interval e.g. 30s, 5m, 1h, 2r for combat rounds or rest)",
+        "effects.added": "Effect for {name}: {amount:+d} {attribute} every {interval}.",
+        "effects.none": "No active effects.",
+        "effects.entry": "{name}: {amount:+d} {attribute} every {interval}, {remaining} left",
+        "effects.cleared": (
+            "Removed {count} effect of {name}.",
+            "Removed {count} effects of {name}.",
+        ),
+        "effects.applied": ":hourglass: Effects:",
+        "effects.not_spendable": "{name}: {attribute} can't be changed, effect removed",
+        "effects.no_fight": "There's no fight here, effects in combat rounds need one.",
+    },
+}
+
+
+class UnknownLocaleException(Exception):
+    def __init__(self, locale: str):
+        super().__init__()
+        self.locale = locale
+
+
+class Template:
+    __slots__ = ("singular", "plural", "constant")
+
+    def __init__(self, message: Message):
+        if isinstance(message, tuple):
+            singular, plural = message
+        else:
+            singular = plural = message
+
+        # Messages without placeholders are returned as is, without formatting
+        self.constant = None
+        if not any(field for _, field, _, _ in Formatter().parse(plural)):
+            self.constant = plural
+
+        # Keep the bound methods, so rendering doesn't have to look them up again
+        self.singular = singular.format
+        self.plural = plural.format
+
+    def render(self, **kwargs) -> str:
+        if self.constant is not None:
+            return self.constant
+
+        if kwargs.get("count") == 1:
+            return self.singular(**kwargs)
+
+        return self.plural(**kwargs)
+
+
+class MessageCatalog:
+    def __init__(self, locale: str):
+        if locale not in Catalogs:
+            raise UnknownLocaleException(locale)
+
+        self.locale = locale
+
+        # Untranslated messages fall back to the default locale
+        messages = dict(Catalogs[DefaultLocale])
+        messages.update(Catalogs[locale])
+        self.templates = {key: Template(message) for key, message in messages.items()}
+
+    def render(self, key: str, **kwargs) -> str:
+        return self.templates[key].render(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_catalog(locale: str = DefaultLocale) -> MessageCatalog:
+    return MessageCatalog(locale)
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+
+from asyncio import events
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+Frame = Tuple[str, int, str]
+
+# Every callback the event loop runs is called from Handle._run
+HandleRun = events.Handle._run.__code__
+
+
+class ProfilerRunningException(Exception):
+    pass
+
+
+def frame_label(frame: Frame) -> str:
+    filename, lineno, name = frame
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def is_idle(stack: Tuple[Frame, ...]) -> bool:
+    # The event loop waiting for I/O always ends up in selectors.*.select()
+    return bool(stack) and stack[-1][0].endswith("selectors.py")
+
+
+class ProfileReport:
+    def __init__(self, duration: float, stacks: Counter, slow_callbacks: List[str]):
+        self.duration = duration
+        self.stacks = stacks
+        self.slow_callbacks = slow_callbacks
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    @property
+    def busy_samples(self) -> int:
+        return sum(n for stack, n in self.stacks.items() if not is_idle(stack))
+
+    def top_functions(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """Returns (function, own samples, total samples) of the hottest functions."""
+        own: Dict[Frame, int] = Counter()
+        total: Dict[Frame, int] = Counter()
+        for stack, count in self.stacks.items():
+            if not stack or is_idle(stack):
+                continue
+
+            own[stack[-1]] += count
+            # Recursive functions are only counted once per sample
+            for frame in set(stack):
+                total[frame] += count
+
+        hottest = sorted(
+            own, key=lambda frame: (own[frame], total[frame]), reverse=True
+        )
+        return [(frame_label(frame), own[frame], total[frame]) for frame in hottest[:n]]
+
+    def collapsed(self) -> str:
+        """Renders the samples in the collapsed stack format used by flamegraph tools."""
+        return "".join(
+            ";".join(frame_label(frame) for frame in stack) + f" {count}\n"
+            for stack, count in self.stacks.most_common()
+        )
+
+
+class SamplingProfiler:
+    """Periodically samples the stack of the event loop thread from a background thread.
+
+    Unlike cProfile, this leaves the profiled code alone, so it is cheap enough to
+    run against a live session. A callback of the loop that shows up in consecutive
+    samples for longer than slow_threshold is reported as blocking the loop.
+    """
+
+    def __init__(
+        self, interval: float = 0.005, slow_threshold: float = 0.1, max_depth: int = 64
+    ):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.max_depth = max_depth
+
+        self.stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target = 0
+        self._started = 0.0
+
+        # The callback the loop was running in the last samples, and since when
+        self.slow_callbacks: List[str] = []
+        self._handle: Optional[FrameType] = None
+        self._callback: Optional[Frame] = None
+        self._first_seen = self._last_seen = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def sample(self):
+        now = time.perf_counter()
+        frame = sys._current_frames().get(self._target)
+        stack: List[Frame] = []
+        handle: Optional[FrameType] = None
+        callback = inner = None
+        while frame is not None:
+            code = frame.f_code
+            entry = (code.co_filename, code.co_firstlineno, code.co_name)
+            if handle is None and code is HandleRun:
+                handle, callback = frame, inner
+            if len(stack) < self.max_depth:
+                stack.append(entry)
+            inner = entry
+            frame = frame.f_back
+
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self._track(handle, callback, now)
+
+    def _track(
+        self, handle: Optional[FrameType], callback: Optional[Frame], now: float
+    ):
+        # A new Handle._run frame means the loop moved on to another callback
+        if handle is not self._handle:
+            self._finish_callback()
+            self._handle, self._callback = handle, callback
+            self._first_seen = now
+        self._last_seen = now
+
+    def _finish_callback(self):
+        seen = self._last_seen - self._first_seen
+        if self._handle is not None and self._callback and seen >= self.slow_threshold:
+            self.slow_callbacks.append(
+                f"{frame_label(self._callback)} took {seen:.3f} seconds"
+            )
+        self._handle = self._callback = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """Starts profiling the calling thread, the one running the event loop."""
+        if self.running:
+            raise ProfilerRunningException()
+
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._started = time.perf_counter()
+        self.slow_callbacks = []
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._run, name="pnpbot-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> ProfileReport:
+        assert self._thread is not None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._finish_callback()
+
+        return ProfileReport(
+            time.perf_counter() - self._started, self.stacks, self.slow_callbacks
+        )
@@ -0,0 +1,158 @@
+import time
+
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple, TYPE_CHECKING
+
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from .systems.base import Dice
+
+if TYPE_CHECKING:
+    from .bot import PnPBot
+
+# Cost of a command in tokens, !roll additionally pays for every ten dice
+DefaultCosts: Dict[str, float] = {
+    "roll": 1.0,
+    "odds": 3.0,
+    "import": 5.0,
+    "export": 3.0,
+}
+DiceCost = 0.1
+
+
+class RateLimitedException(commands.CheckFailure):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__()
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        # A bucket idle for this long is full again, so forgetting it changes nothing
+        self.idle_timeout = capacity / rate
+
+        # Least recently used buckets come first, which makes expiry O(1) amortized
+        self.buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.capacity, now)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.tokens = min(
+                self.capacity, bucket.tokens + (now - bucket.updated) * self.rate
+            )
+            bucket.updated = now
+
+        return bucket
+
+    def expire(self, now: float):
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now - bucket.updated < self.idle_timeout:
+                break
+            del self.buckets[key]
+
+    def retry_after(self, key: Hashable, cost: float, now: float) -> float:
+        # Commands costing more than a full bucket still go through, given a full bucket
+        cost = min(cost, self.capacity)
+        bucket = self._bucket(key, now)
+        if bucket.tokens >= cost:
+            return 0.0
+
+        return (cost - bucket.tokens) / self.rate
+
+    def consume(self, key: Hashable, cost: float):
+        self.buckets[key].tokens -= min(cost, self.capacity)
+
+
+class CommandRateLimiter:
+    def __init__(
+        self,
+        costs: Optional[Dict[str, float]] = None,
+        user: Tuple[float, float] = (0.5, 5),
+        channel: Tuple[float, float] = (1.0, 10),
+        guild: Tuple[float, float] = (3.0, 30),
+    ):
+        self.costs = dict(DefaultCosts, **(costs or {}))
+        self.scopes: List[Tuple[str, RateLimiter]] = [
+            ("user", RateLimiter(*user)),
+            ("channel", RateLimiter(*channel)),
+            ("guild", RateLimiter(*guild)),
+        ]
+
+    def command_cost(self, ctx: Context) -> float:
+        name = ctx.command.qualified_name if ctx.command else ""
+        cost = self.costs.get(name, 1.0)
+
+        if name == "roll":
+            # Systems take different roll arguments, so look at the raw message
+            for word in ctx.message.content.split()[1:2]:
+                try:
+                    cost += Dice(word).number * DiceCost
+                except ValueError:
+                    pass
+
+        return cost
+
+    def check(self, ctx: Context, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        cost = self.command_cost(ctx)
+        keys = {"user": ctx.author.id, "channel": ctx.channel.id}
+        if ctx.guild is not None:
+            # Direct messages have no guild, they'd all end up in one shared bucket
+            keys["guild"] = ctx.guild.id
+        scopes = [(scope, limiter) for scope, limiter in self.scopes if scope in keys]
+
+        # Only take tokens once every scope has enough of them
+        for scope, limiter in scopes:
+            limiter.expire(now)
+            retry_after = limiter.retry_after(keys[scope], cost, now)
+            if retry_after > 0:
+                raise RateLimitedException(scope, retry_after)
+
+        for scope, limiter in scopes:
+            limiter.consume(keys[scope], cost)
+
+
+def subcommand_follows(ctx: Context) -> bool:
+    """Whether ctx invokes a group that hands over to one of its subcommands."""
+    if not isinstance(ctx.command, commands.Group):
+        return False
+
+    # Before the group runs, the view still points right behind its name
+    words = ctx.view.buffer[ctx.view.index :].split(maxsplit=1)
+    return bool(words) and words[0] in ctx.command.all_commands
+
+
+class RateLimitedCog(commands.Cog):
+    """Charges every command of the cog against the bot's rate limiter.
+
+    Commands only pay right before they run, once their checks passed, so commands
+    rejected e.g. for a missing role are free. Groups leave it to their subcommand.
+    Commands issued during startup then wait until the characters are available.
+    """
+
+    def __init__(self, bot: "PnPBot"):
+        super().__init__()
+
+        self.bot = bot
+
+    async def cog_before_invoke(self, ctx: Context):
+        if not subcommand_follows(ctx):
+            self.bot.rate_limiter.check(ctx)
+
+        await self.bot.wait_for_stats()
@@ -0,0 +1,259 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from .character import Character
+
+SharedStoreFile = Path("pnpbot.sqlite")
+
+Schema = """
+CREATE TABLE IF NOT EXISTS leases (
+    campaign TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    token INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    campaign TEXT PRIMARY KEY,
+    worker TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    campaign TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (campaign, user_id)
+);
+CREATE TABLE IF NOT EXISTS locales (
+    campaign TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    locale TEXT NOT NULL,
+    PRIMARY KEY (campaign, guild_id)
+);
+"""
+
+
+class LeaseLostException(Exception):
+    def __init__(self, campaign: str):
+        super().__init__(campaign)
+        self.campaign = campaign
+
+
+class SharedStore:
+    """Character state and campaign ownership shared by all worker processes.
+
+    A campaign is only written by the worker holding its lease. Every acquisition
+    by a new owner increments the lease token, and writes are rejected unless they
+    carry the current token, so a worker that lost its lease can't overwrite the
+    state its successor already loaded.
+    """
+
+    def __init__(self, path: Union[str, Path] = SharedStoreFile, timeout: float = 30.0):
+        # Autocommit mode, transactions are started explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(
+            str(path), timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(Schema)
+
+    def _transaction(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def _check_lease(self, campaign: str, token: int):
+        row = self.connection.execute(
+            "SELECT token FROM leases WHERE campaign = ?", (campaign,)
+        ).fetchone()
+        if row is None or row[0] != token:
+            raise LeaseLostException(campaign)
+
+    def acquire(
+        self, campaign: str, owner: str, ttl: float, now: Optional[float] = None
+    ) -> Optional[int]:
+        """Returns the lease token, or None if another owner holds a live lease."""
+        now = time.time() if now is None else now
+        with self.lock:
+            self._transaction()
+            try:
+                row = self.connection.execute(
+                    "SELECT owner, token, expires FROM leases WHERE campaign = ?",
+                    (campaign,),
+                ).fetchone()
+
+                if row is None:
+                    token = 1
+                else:
+                    current_owner, token, expires = row
+                    if current_owner != owner:
+                        if expires > now:
+                            self.connection.execute("ROLLBACK")
+                            return None
+                        token += 1
+
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)",
+                    (campaign, owner, token, now + ttl),
+                )
+                self.connection.execute("COMMIT")
+                return token
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def renew(
+        self,
+        campaign: str,
+        owner: str,
+        token: int,
+        ttl: float,
+        now: Optional[float] = None,
+    ) -> bool:
+        now = time.time() if now is None else now
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE leases SET expires = ? "
+                "WHERE campaign = ? AND owner = ? AND token = ? AND expires > ?",
+                (now + ttl, campaign, owner, token, now),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, campaign: str, owner: str, token: int):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE leases SET expires = 0 "
+                "WHERE campaign = ? AND owner = ? AND token = ?",
+                (campaign, owner, token),
+            )
+
+    def owners(self, now: Optional[float] = None) -> Dict[str, str]:
+        now = time.time() if now is None else now
+        with self.lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT campaign, owner FROM leases WHERE expires > ?", (now,)
+                )
+            )
+
+    def assignments(self) -> Dict[str, str]:
+        with self.lock:
+            return dict(
+                self.connection.execute("SELECT campaign, worker FROM assignments")
+            )
+
+    def assign(self, assignments: Dict[str, str]):
+        with self.lock:
+            self._transaction()
+            try:
+                self.connection.execute("DELETE FROM assignments")
+                self.connection.executemany(
+                    "INSERT INTO assignments VALUES (?, ?)", assignments.items()
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def load_characters(self, campaign: str) -> Dict[int, Character]:
+        with self.lock:
+            return {
+                user_id: pickle.loads(data)
+                for user_id, data in self.connection.execute(
+                    "SELECT user_id, data FROM characters WHERE campaign = ?",
+                    (campaign,),
+                )
+            }
+
+    def save_characters(
+        self, campaign: str, token: int, characters: Dict[int, Optional[bytes]]
+    ):
+        """Writes pickled characters, None deletes one. Fenced by the lease token."""
+        with self.lock:
+            self._transaction()
+            try:
+                self._check_lease(campaign, token)
+
+                for user_id, data in characters.items():
+                    if data is None:
+                        self.connection.execute(
+                            "DELETE FROM characters WHERE campaign = ? AND user_id = ?",
+                            (campaign, user_id),
+                        )
+                    else:
+                        self.connection.execute(
+                            "INSERT OR REPLACE INTO characters VALUES (?, ?, ?)",
+                            (campaign, user_id, data),
+                        )
+
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def load_locales(self, campaign: str) -> Dict[int, str]:
+        with self.lock:
+            return dict(
+                self.connection.execute(
+                    "SELECT guild_id, locale FROM locales WHERE campaign = ?",
+                    (campaign,),
+                )
+            )
+
+    def save_locale(self, campaign: str, token: int, guild_id: int, locale: str):
+        with self.lock:
+            self._transaction()
+            try:
+                self._check_lease(campaign, token)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO locales VALUES (?, ?, ?)",
+                    (campaign, guild_id, locale),
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class CampaignStorage:
+    """Storage backend of a bot serving one campaign out of the shared store."""
+
+    def __init__(self, store: SharedStore, campaign: str, token: int):
+        self.store = store
+        self.campaign = campaign
+        self.token = token
+
+    def load_characters(self) -> Dict[int, Character]:
+        return self.store.load_characters(self.campaign)
+
+    def dump_characters(
+        self, characters: Dict[int, Character], user_ids: Iterable[int]
+    ) -> Dict[int, Optional[bytes]]:
+        # Only the changed rows are written instead of the whole state
+        dump: Dict[int, Optional[bytes]] = {}
+        for user_id in user_ids:
+            character = characters.get(user_id)
+            dump[user_id] = pickle.dumps(character) if character else None
+
+        return dump
+
+    def write_characters(self, dump: Dict[int, Optional[bytes]]):
+        self.store.save_characters(self.campaign, self.token, dump)
+
+    def save_characters(
+        self, characters: Dict[int, Character], user_ids: Iterable[int]
+    ):
+        self.write_characters(self.dump_characters(characters, user_ids))
+
+    def load_locales(self) -> Dict[int, str]:
+        return self.store.load_locales(self.campaign)
+
+    def save_locale(self, guild_id: int, locale: str):
+        self.store.save_locale(self.campaign, self.token, guild_id, locale)
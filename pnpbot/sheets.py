@@ -0,0 +1,380 @@
+import csv
+import json
+import logging
+
+from enum import Enum
+from itertools import islice
+from typing import (
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .character import (
+    Attribute,
+    Character,
+    AnonymousAttributeException,
+    AttributeParseException,
+    MissingAttributesException,
+    OverflowAttributeException,
+    UnderflowAttributeException,
+    UnknownAttributeException,
+    VersionConflictException,
+)
+from .systems.base import BaseSystem
+from .messages import MessageCatalog, get_catalog
+
+_logger = logging.getLogger("pnpbot")
+
+# Applies values to a character, if it's still at the given version
+PatchCallback = Callable[[int, int, Dict[str, Union[int, Attribute]]], None]
+
+
+class UnknownSheetFormatException(Exception):
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+
+class SheetFormat(Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+    @staticmethod
+    def from_filename(name: str) -> "SheetFormat":
+        extension = name.rsplit(".", 1)[-1].lower()
+        if extension == "csv":
+            return SheetFormat.CSV
+        elif extension in ("jsonl", "json", "ndjson"):
+            return SheetFormat.JSONL
+
+        raise UnknownSheetFormatException(name)
+
+
+class SheetRow(NamedTuple):
+    line: int
+    player: str
+    name: str
+    attributes: List[str]
+    # Version of the character the sheet was exported at, if it says so
+    version: Optional[int] = None
+
+
+class SheetRowError(NamedTuple):
+    line: int
+    player: str
+    message: str
+
+    def render(self, messages: MessageCatalog) -> str:
+        player = f" ({self.player})" if self.player else ""
+        return messages.render(
+            "import_row_error", line=self.line, player=player, message=self.message
+        )
+
+    def __str__(self) -> str:
+        return self.render(get_catalog())
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.updated = 0
+        self.errors: List[SheetRowError] = []
+
+
+def format_attribute(attribute: Attribute) -> str:
+    if not attribute.limited:
+        return str(attribute.value)
+
+    if attribute.minimum:
+        return f"{attribute.minimum}/{attribute.value}/{attribute.maximum}"
+
+    return f"{attribute.value}/{attribute.maximum}"
+
+
+def describe_attribute_error(e: Exception, messages: MessageCatalog) -> str:
+    if isinstance(e, AnonymousAttributeException):
+        return messages.render("attribute_anonymous")
+    elif isinstance(e, AttributeParseException):
+        if e.stat_name:
+            return messages.render("attribute_invalid", name=e.stat_name)
+        return messages.render("attribute_invalid_format")
+    elif isinstance(e, UnknownAttributeException):
+        return messages.render("attribute_unknown", name=e.stat_name)
+    elif isinstance(e, MissingAttributesException):
+        return messages.render("attribute_missing", names=", ".join(e.missing))
+
+    return str(e)
+
+
+def _read_csv(
+    lines: Iterable[str], messages: MessageCatalog
+) -> Iterator[Union[SheetRow, SheetRowError]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        line = reader.line_num
+        player = (row.pop("player", None) or "").strip()
+        name = (row.pop("name", None) or "").strip()
+        version = (row.pop("version", None) or "").strip()
+        if not player or not name:
+            yield SheetRowError(line, player, messages.render("import_missing_columns"))
+            continue
+
+        if version and not version.isdigit():
+            yield SheetRowError(line, player, messages.render("import_invalid_row"))
+            continue
+
+        attributes = [
+            f"{key.strip()}={value.strip()}"
+            for key, value in row.items()
+            if key and value and value.strip()
+        ]
+        yield SheetRow(
+            line, player, name, attributes, int(version) if version else None
+        )
+
+
+def _read_jsonl(
+    lines: Iterable[str], messages: MessageCatalog
+) -> Iterator[Union[SheetRow, SheetRowError]]:
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+
+        try:
+            entry = json.loads(text)
+            player = str(entry["player"]).strip()
+            name = str(entry["name"]).strip()
+            attributes = [
+                f"{key}={value}" for key, value in entry.get("attributes", {}).items()
+            ]
+            version = entry.get("version")
+            version = None if version is None else int(version)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            yield SheetRowError(line, "", messages.render("import_invalid_row"))
+            continue
+
+        yield SheetRow(line, player, name, attributes, version)
+
+
+def read_sheets(
+    lines: Iterable[str],
+    sheet_format: SheetFormat,
+    messages: Optional[MessageCatalog] = None,
+) -> Iterator[Union[SheetRow, SheetRowError]]:
+    messages = messages or get_catalog()
+    if sheet_format == SheetFormat.CSV:
+        return _read_csv(lines, messages)
+
+    return _read_jsonl(lines, messages)
+
+
+class ValidatedRow(NamedTuple):
+    row: SheetRow
+    attributes: List[Attribute]
+    errors: List[Exception]
+
+
+def _patch_row(
+    validated: ValidatedRow,
+    user_id: int,
+    patch: PatchCallback,
+    messages: MessageCatalog,
+) -> Optional[SheetRowError]:
+    row = validated.row
+    assert row.version is not None
+
+    # A patch only names the attributes it changes
+    errors = [
+        e for e in validated.errors if not isinstance(e, MissingAttributesException)
+    ]
+    if errors:
+        message = " ".join(describe_attribute_error(e, messages) for e in errors)
+        return SheetRowError(row.line, row.player, message)
+
+    given = {text.partition("=")[0].strip().lower() for text in row.attributes}
+    values: Dict[str, Union[int, Attribute]] = {
+        stat.name: stat for stat in validated.attributes if stat.name.lower() in given
+    }
+
+    try:
+        patch(user_id, row.version, values)
+    except VersionConflictException as e:
+        return SheetRowError(
+            row.line,
+            row.player,
+            messages.render(
+                "import_version_conflict", expected=e.expected, actual=e.actual
+            ),
+        )
+    except (OverflowAttributeException, UnderflowAttributeException):
+        message = messages.render("import_invalid_row")
+        return SheetRowError(row.line, row.player, message)
+
+    return None
+
+
+def validate_chunks(
+    system: BaseSystem,
+    rows: Iterable[Union[SheetRow, SheetRowError]],
+    chunk_size: int = 50,
+) -> Iterator[List[Union[ValidatedRow, SheetRowError]]]:
+    """Validates the attributes of the rows, one chunk at a time.
+
+    This is the expensive part of an import, and it doesn't touch any characters,
+    so it can run away from the characters and the players they belong to.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        yield [
+            row
+            if isinstance(row, SheetRowError)
+            else ValidatedRow(row, *system.validate_attributes(row.attributes))
+            for row in chunk
+        ]
+
+
+def resolve_chunk(
+    chunk: List[Union[ValidatedRow, SheetRowError]],
+    resolve_player: Callable[[str], Optional[int]],
+    existing: Container[int],
+    seen: Set[int],
+    report: ImportReport,
+    messages: MessageCatalog,
+    patch: Optional[PatchCallback] = None,
+) -> List[Tuple[int, str, List[Attribute]]]:
+    """Returns the new characters of a validated chunk, the rows left are reported.
+
+    Players are resolved and checked against the existing characters right before
+    the chunk is committed, so both have to be current at that point.
+    """
+    entries = []
+    for validated in chunk:
+        if isinstance(validated, SheetRowError):
+            report.errors.append(validated)
+            continue
+
+        row = validated.row
+        user_id = resolve_player(row.player)
+        if user_id is None:
+            report.errors.append(
+                SheetRowError(row.line, row.player, messages.render("no_player"))
+            )
+            continue
+
+        # Rows exported with a version may update the character they came from
+        updating = row.version is not None and user_id not in seen
+        if patch and updating and user_id in existing:
+            seen.add(user_id)
+            error = _patch_row(validated, user_id, patch, messages)
+            if error:
+                report.errors.append(error)
+            else:
+                report.updated += 1
+            continue
+
+        if user_id in existing or user_id in seen:
+            report.errors.append(
+                SheetRowError(row.line, row.player, messages.render("import_duplicate"))
+            )
+            continue
+
+        if validated.errors:
+            message = " ".join(
+                describe_attribute_error(e, messages) for e in validated.errors
+            )
+            report.errors.append(SheetRowError(row.line, row.player, message))
+            continue
+
+        seen.add(user_id)
+        entries.append((user_id, row.name, validated.attributes))
+
+    return entries
+
+
+def import_sheets(
+    system: BaseSystem,
+    rows: Iterable[Union[SheetRow, SheetRowError]],
+    resolve_player: Callable[[str], Optional[int]],
+    commit: Callable[[List[Tuple[int, str, List[Attribute]]]], None],
+    existing: Container[int] = (),
+    chunk_size: int = 50,
+    messages: Optional[MessageCatalog] = None,
+    patch: Optional[PatchCallback] = None,
+) -> ImportReport:
+    messages = messages or get_catalog()
+    report = ImportReport()
+    seen: Set[int] = set()
+
+    for chunk in validate_chunks(system, rows, chunk_size):
+        entries = resolve_chunk(
+            chunk, resolve_player, existing, seen, report, messages, patch
+        )
+
+        # Every chunk ends up in a single write, no matter how many rows it held
+        if entries:
+            commit(entries)
+            report.imported += len(entries)
+            _logger.debug(f"Imported chunk of {len(entries)} characters")
+
+    return report
+
+
+def export_sheets(
+    characters: Dict[int, Character],
+    attribute_names: List[str],
+    sheet_format: SheetFormat,
+) -> Iterator[str]:
+    if sheet_format == SheetFormat.CSV:
+        buffer = _LineBuffer()
+        writer = csv.writer(buffer)
+        writer.writerow(["player", "name", "version"] + attribute_names)
+        yield buffer.pop()
+
+        for user_id, character in characters.items():
+            values = []
+            for attribute_name in attribute_names:
+                attribute = character.get_attribute(attribute_name)
+                values.append(format_attribute(attribute) if attribute else "")
+
+            writer.writerow([user_id, character.name, character.version] + values)
+            yield buffer.pop()
+        return
+
+    for user_id, character in characters.items():
+        attributes = {
+            attribute.name: format_attribute(attribute)
+            for attribute in character.attributes.values()
+        }
+        entry = {
+            "player": user_id,
+            "name": character.name,
+            "version": character.version,
+            "attributes": attributes,
+        }
+        yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+class _LineBuffer:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def write(self, text: str):
+        self.lines.append(text)
+
+    def pop(self) -> str:
+        text = "".join(self.lines)
+        self.lines = []
+        return text
@@ -0,0 +1,105 @@
+import json
+import pickle
+import time
+
+from typing import Any, Dict, Iterable, Protocol
+from pathlib import Path
+
+from .character import Character
+
+StatsFile = Path("stats.pickle")
+LocalesFile = Path("locales.json")
+ProfilesDirectory = Path("profiles")
+
+
+def load_characters(path: Path = StatsFile) -> Dict[int, Character]:
+    if not path.exists():
+        return {}
+
+    with open(path, "rb") as stream:
+        return pickle.loads(stream.read())
+
+
+def save_characters(characters: Dict[int, Character], path: Path = StatsFile):
+    with open(path, "wb") as stream:
+        stream.write(pickle.dumps(characters))
+
+
+def load_locales(path: Path = LocalesFile) -> Dict[int, str]:
+    if not path.exists():
+        return {}
+
+    with open(path, "r", encoding="utf-8") as stream:
+        return {int(guild_id): locale for guild_id, locale in json.load(stream).items()}
+
+
+def save_locales(locales: Dict[int, str], path: Path = LocalesFile):
+    with open(path, "w", encoding="utf-8") as stream:
+        json.dump(locales, stream)
+
+
+def save_profile(collapsed: str, directory: Path = ProfilesDirectory) -> Path:
+    directory.mkdir(exist_ok=True)
+    path = directory / time.strftime("profile-%Y%m%d-%H%M%S.folded")
+    with open(path, "w", encoding="utf-8") as stream:
+        stream.write(collapsed)
+
+    return path
+
+
+class Storage(Protocol):
+    """Where a bot keeps its characters and guild locales.
+
+    Saving is split in two: dump_characters runs on the event loop and has to copy
+    whatever it needs, write_characters then runs in a worker thread.
+    """
+
+    def load_characters(self) -> Dict[int, Character]:
+        ...
+
+    def dump_characters(
+        self, characters: Dict[int, Character], user_ids: Iterable[int]
+    ) -> Any:
+        ...
+
+    def write_characters(self, dump: Any):
+        ...
+
+    def load_locales(self) -> Dict[int, str]:
+        ...
+
+    def save_locale(self, guild_id: int, locale: str):
+        ...
+
+
+class PickleStorage:
+    """Default storage backend, the whole state lives in a single pickle."""
+
+    def __init__(self, path: Path = StatsFile, locales_path: Path = LocalesFile):
+        self.path = path
+        self.locales_path = locales_path
+
+    def load_characters(self) -> Dict[int, Character]:
+        return load_characters(self.path)
+
+    def dump_characters(
+        self, characters: Dict[int, Character], user_ids: Iterable[int]
+    ) -> bytes:
+        return pickle.dumps(characters)
+
+    def write_characters(self, dump: bytes):
+        with open(self.path, "wb") as stream:
+            stream.write(dump)
+
+    def save_characters(
+        self, characters: Dict[int, Character], user_ids: Iterable[int]
+    ):
+        self.write_characters(self.dump_characters(characters, user_ids))
+
+    def load_locales(self) -> Dict[int, str]:
+        return load_locales(self.locales_path)
+
+    def save_locale(self, guild_id: int, locale: str):
+        locales = load_locales(self.locales_path)
+        locales[guild_id] = locale
+        save_locales(locales, self.locales_path)
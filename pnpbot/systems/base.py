@@ -1,7 +1,8 @@
 import abc
 import logging
+import random
 from inspect import signature, Parameter
-from typing import Tuple, List, Any, Optional
+from typing import Tuple, List, Any, Optional, Callable, Hashable, Dict, Union
 
 from discord.ext import commands
 from discord.ext.commands import Context
@@ -9,10 +10,16 @@ from discord.ext.commands import Context
 from pnpbot.character import (
     Character,
     Attribute,
+    Formula,
     AnonymousAttributeException,
     UnknownAttributeException,
     MissingAttributesException,
+    AttributeParseException,
+    OverflowAttributeException,
+    UnderflowAttributeException,
 )
+from pnpbot.executor import ComputeExecutor
+from pnpbot.messages import MessageCatalog
 
 
 _logger = logging.getLogger("pnpbot")
@@ -41,12 +48,60 @@ class Dice:
         return f"{self.number}d{self.sides}"
 
 
+def outcome_key(success: bool, critical: bool) -> str:
+    if success:
+        return "critical_success" if critical else "success"
+
+    return "critical_failure" if critical else "failure"
+
+
+def apply_template(stat: Attribute, template: Attribute):
+    stat.spendable = template.spendable
+    if template.formula:
+        stat.limited = template.limited
+        stat.formula = template.formula
+    elif template.limited and not stat.limited:
+        # A pool given as a single number is full
+        stat.limited = True
+        stat.minimum = min(stat.minimum, stat.value)
+        stat.maximum = stat.value
+
+
+def derived_attribute(name: str, template: Attribute) -> Attribute:
+    return Attribute(
+        name=name,
+        limited=template.limited,
+        spendable=template.spendable,
+        formula=template.formula,
+    )
+
+
 class BaseSystem(abc.ABC):
     Name = "Base"
-    Attributes: List[str] = []
-    RollHelp = ""
+    Attributes: List[Union[str, Attribute]] = []
+    # Message catalog keys of the usage help
+    RollHelp = "roll_help"
+    OddsHelp = "roll_help"
+    # Computations estimated to cost more than this are moved to a worker process
+    OffloadThreshold = 10_000
+    InitiativeDice = Dice("1d20")
+    Initiative: Optional[Formula] = None
+    # A combatant whose vitality drops to its minimum is defeated
+    DefeatAttribute: Optional[str] = None
 
     def __init__(self):
+        self.executor = ComputeExecutor()
+        # Every roll goes through this generator, so it can be swapped or seeded
+        self.rng = random.Random()
+
+        # Precompiled lookup from lower case attribute names to proper name and template
+        self._attributes: Dict[str, Tuple[str, Optional[Attribute]]] = {}
+        for attribute in self.Attributes:
+            if isinstance(attribute, Attribute):
+                self._attributes[attribute.name.lower()] = (attribute.name, attribute)
+            else:
+                self._attributes[attribute.lower()] = (attribute, None)
+
         # Automatically derive !roll parameter types from handle_roll's signature
         self._roll_params: List[type] = []
         child_signature = signature(self.handle_roll)
@@ -81,38 +136,143 @@ class BaseSystem(abc.ABC):
 
         return final_args
 
+    def messages(self, ctx: Context) -> MessageCatalog:
+        return ctx.bot.messages(ctx.guild)
+
+    def roll_dice(self, dice: Dice) -> List[int]:
+        return self.rng.choices(range(1, dice.sides + 1), k=dice.number)
+
+    def roll_initiative(self, character: Optional[Character]) -> int:
+        result = sum(self.roll_dice(self.InitiativeDice))
+        if not self.Initiative or not character:
+            return result
+
+        values = {}
+        for name in self.Initiative.dependencies:
+            stat = character.get_attribute(name)
+            values[name] = stat.value if stat else 0
+
+        return result + self.Initiative.evaluate(values)
+
+    def attribute_names(self) -> List[str]:
+        return [name for name, _ in self._attributes.values()]
+
     def find_proper_name(self, name: str) -> Optional[str]:
-        for attribute_name in self.Attributes:
-            if attribute_name.lower() == name.lower():
-                return attribute_name
+        entry = self._attributes.get(name.lower())
+        return entry[0] if entry else None
 
-        return None
+    def find_template(self, name: str) -> Optional[Attribute]:
+        entry = self._attributes.get(name.lower())
+        return entry[1] if entry else None
 
-    def parse_attributes(self, attributes: List[str]) -> List[Attribute]:
+    def validate_attributes(
+        self, attributes: List[str]
+    ) -> Tuple[List[Attribute], List[Exception]]:
         result = []
-        defined = []
+        errors: List[Exception] = []
+        defined = set()
         for attribute in attributes:
-            stat = Attribute.from_str(attribute)
-            defined.append(stat.name.lower())
+            try:
+                stat = Attribute.from_str(attribute)
+            except AttributeParseException as e:
+                defined.add(e.stat_name.lower())
+                errors.append(e)
+                continue
+            except (OverflowAttributeException, UnderflowAttributeException):
+                name, sep, _ = attribute.partition("=")
+                name = name.strip() if sep else ""
+                defined.add(name.lower())
+                errors.append(AttributeParseException(name))
+                continue
 
             if not stat.name:
-                raise AnonymousAttributeException()
+                errors.append(AnonymousAttributeException())
+                continue
+
+            entry = self._attributes.get(stat.name.lower())
+            if not entry:
+                errors.append(UnknownAttributeException(stat.name))
+                continue
 
-            proper_name = self.find_proper_name(stat.name)
-            if not proper_name:
-                raise UnknownAttributeException(stat.name)
+            stat.name, template = entry
+            defined.add(stat.name.lower())
 
-            stat.name = proper_name
+            if template:
+                apply_template(stat, template)
 
             result.append(stat)
 
-        undefined = (attr for attr in self.Attributes if attr.lower() not in defined)
+        undefined = []
+        for lower_name, (name, template) in self._attributes.items():
+            if lower_name in defined:
+                continue
+
+            # Derived attributes don't have to be given, they start out full
+            if template and template.formula:
+                result.append(derived_attribute(name, template))
+                continue
+
+            undefined.append(name)
 
         if undefined:
-            raise MissingAttributesException(undefined)
+            errors.append(MissingAttributesException(undefined))
+
+        return result, errors
+
+    def migrate_character(self, character: Character):
+        """Applies the current templates to a character stored by an older version."""
+        for lower_name, (name, template) in self._attributes.items():
+            if not template:
+                continue
+
+            stat = character.get_attribute(name)
+            if stat is None:
+                if template.formula:
+                    character.attributes[lower_name] = derived_attribute(name, template)
+                continue
+
+            apply_template(stat, template)
+
+        # Formulas of stored characters may refer to attributes they don't have
+        for stat in character.attributes.values():
+            if stat.formula and not stat.formula.dependencies <= set(
+                character.attributes
+            ):
+                stat.formula = None
+
+        character.build_dependencies()
+        for derived in character.derived_order:
+            character.recompute_attribute(derived)
+
+    def parse_attributes(self, attributes: List[str]) -> List[Attribute]:
+        result, errors = self.validate_attributes(attributes)
+
+        if errors:
+            raise errors[0]
 
         return result
 
+    async def compute(
+        self, user_id: int, cost: int, func: Callable, *args: Hashable
+    ) -> Any:
+        if cost < self.OffloadThreshold:
+            return func(*args)
+
+        _logger.debug(f"Offloading {func.__qualname__}{args} (cost {cost})")
+        return await self.executor.submit(user_id, func, *args)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    async def handle_odds(
+        self, ctx: Context, character: Optional[Character], *args: str
+    ):
+        await ctx.send(self.messages(ctx).render("odds_unsupported", system=self.Name))
+
+    async def roll(self, ctx: Context, character: Optional[Character], args: List[str]):
+        """Handles !roll, systems with several forms of it can pick one here."""
+        await self.handle_roll(ctx, character, *self.parse_roll_args(args))
+
     @abc.abstractmethod
     def handle_roll(self, ctx: Context, character: Optional[Character], **kwargs: Any):
         raise NotImplementedError()
@@ -1,13 +1,86 @@
-import random
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Optional, NamedTuple, Sequence, Union
 from discord.ext.commands import Context
-from .base import BaseSystem, Dice
+from .base import BaseSystem, Dice, outcome_key
+from pnpbot.character import Attribute, Character, Formula
+from pnpbot.messages import MessageCatalog
 
 import logging
 
 _logger = logging.getLogger("pnpbot")
 
 
+class CheckResult(NamedTuple):
+    rolls: Tuple[int, int, int]
+    passed: Tuple[bool, bool, bool]
+    successes: int
+    talent: int
+    success: bool
+    critical_success: bool
+    critical_failure: bool
+
+
+def evaluate_check(
+    rolls: Tuple[int, int, int], base: Tuple[int, int, int], talent: int
+) -> CheckResult:
+    TaW = talent
+    passed = []
+    for r, b in zip(rolls, base):
+        if r <= b:
+            passed.append(True)
+        else:
+            passed.append(r <= b + TaW)
+            TaW -= r - b
+
+    successes = sum(passed)
+
+    ones = rolls.count(1)
+    twenties = rolls.count(20)
+
+    success = successes >= 3 or ones >= 2
+    return CheckResult(
+        rolls=rolls,
+        passed=(passed[0], passed[1], passed[2]),
+        successes=successes,
+        talent=TaW,
+        success=success,
+        critical_success=success and ones >= 2,
+        critical_failure=not success and twenties >= 2,
+    )
+
+
+def evaluate_checks(
+    rolls: List[int], base: Tuple[int, int, int], talent: int
+) -> List[CheckResult]:
+    # Interpret the flat roll list as a 3xN matrix, one row per talent check
+    rows = zip(*[iter(rolls)] * 3)
+    return [evaluate_check(row, base, talent) for row in rows]
+
+
+def evaluate_party_checks(
+    rolls: List[int], bases: List[Tuple[int, int, int]], talent: int
+) -> List[CheckResult]:
+    # The same 3xN matrix, but every row is checked against its own bases
+    rows = zip(*[iter(rolls)] * 3)
+    return [evaluate_check(row, base, talent) for row, base in zip(rows, bases)]
+
+
+def check_probability(
+    base: Tuple[int, int, int], talent: int, sides: int = 20
+) -> Tuple[float, float, float]:
+    # Exact odds by enumerating every possible outcome of the three dice
+    faces = range(1, sides + 1)
+    success = critical_success = critical_failure = 0
+    for a in faces:
+        for b in faces:
+            for c in faces:
+                result = evaluate_check((a, b, c), base, talent)
+                success += result.success
+                critical_success += result.critical_success
+                critical_failure += result.critical_failure
+
+    total = sides ** 3
+    return success / total, critical_success / total, critical_failure / total
+
 
 class System(BaseSystem):
     Name = "DSA"
@@ -20,95 +93,250 @@ class System(BaseSystem):
         "GE",
         "KO",
         "KK",
-        "LeP",
-        "Aus",
-        "AsP",
-        "KaP",
+        Attribute(
+            name="LeP",
+            limited=True,
+            spendable=True,
+            formula=Formula("(KO + KO + KK) / 2"),
+        ),
+        Attribute(
+            name="Aus",
+            limited=True,
+            spendable=True,
+            formula=Formula("(MU + KO + GE) / 2"),
+        ),
+        # Only spellcasters and clerics have a pool, everyone else has 0
+        Attribute(name="AsP", limited=True, spendable=True),
+        Attribute(name="KaP", limited=True, spendable=True),
     ]
     RollArgs = [Dice, int, int, int, int]
-    RollHelp = "Verwendung: !roll XdY BasisWert BasisWert BasisWert TalentWert  (z.B. `!roll 3d20 10 11 12 5`)"
+    RollHelp = "dsa.roll_help"
+    OddsHelp = "dsa.odds_help"
+    MaxChecks = 20
+    InitiativeDice = Dice("1d6")
+    DefeatAttribute = "LeP"
+    Initiative = Formula("(MU + MU + IN + GE) / 5")
 
-    async def handle_roll(
-        self, ctx: Context, dice: Dice, base1: int, base2: int, base3: int, talent: int
-    ):
+    async def roll(self, ctx: Context, character: Optional[Character], args: List[str]):
+        # !roll XdY MU IN GE TaW [player ...] takes the bases from the character sheets
+        if len(args) >= 5 and not args[1].lstrip("+-").isdigit():
+            names = (args[1], args[2], args[3])
+            await self.handle_sheet_roll(
+                ctx, character, Dice(args[0]), names, int(args[4]), args[5:]
+            )
+            return
+
+        await super().roll(ctx, character, args)
+
+    def dice_problem(
+        self, messages: MessageCatalog, dice: Dice, groups: int = 1
+    ) -> Optional[str]:
+        """Explains why the dice can't be rolled as talent checks, if they can't."""
         if dice.number <= 0 or dice.sides <= 0:
-            await ctx.send("Verwendung: !roll XdY Basis (e.g. `!roll 3d20 15`")
+            return messages.render("roll_usage")
+
+        if dice.number % 3 != 0:
+            return messages.render("dsa.three_dice")
+
+        if dice.number // 3 * groups > self.MaxChecks:
+            return messages.render("dsa.max_checks", count=self.MaxChecks)
+
+        if dice.sides > 100:
+            return messages.render("roll_max_sides")
+
+        return None
+
+    async def handle_odds(
+        self, ctx: Context, character: Optional[Character], *args: str
+    ):
+        messages = self.messages(ctx)
+        try:
+            base1, base2, base3, talent, *rest = map(int, args)
+            sides = rest[0] if rest else 20
+        except ValueError:
+            await ctx.send(messages.render(self.OddsHelp))
             return
 
-        if dice.number > 50:
-            await ctx.send("Du kannst maximal 50 Würfel gleichzeitig werfen.")
+        if sides <= 0 or sides > 100:
+            await ctx.send(messages.render("roll_max_sides"))
             return
 
-        if dice.sides > 100:
-            await ctx.send("Die Würfel können nicht mehr als 100 Seiten haben.")
+        success, critical_success, critical_failure = await self.compute(
+            ctx.author.id,
+            sides ** 3,
+            check_probability,
+            (base1, base2, base3),
+            talent,
+            sides,
+        )
+
+        await ctx.send(
+            messages.render(
+                "dsa.odds_result",
+                mention=ctx.author.mention,
+                success=success,
+                critical_success=critical_success,
+                critical_failure=critical_failure,
+            )
+        )
+
+    async def handle_roll(
+        self,
+        ctx: Context,
+        character: Optional[Character],
+        dice: Dice,
+        base1: int,
+        base2: int,
+        base3: int,
+        talent: int,
+    ):
+        messages = self.messages(ctx)
+        problem = self.dice_problem(messages, dice)
+        if problem:
+            await ctx.send(problem)
+            return
+
+        checks = dice.number // 3
+        base = (base1, base2, base3)
+        _logger.debug(f"talent: '{talent}'")
+
+        rolls = self.roll_dice(dice)
+        results = evaluate_checks(rolls, base, talent)
+
+        if checks == 1:
+            await ctx.send(format_check(messages, ctx.author.mention, results[0]))
+        else:
+            await ctx.send(
+                format_check_table(messages, ctx.author.mention, results, base)
+            )
+
+    async def handle_sheet_roll(
+        self,
+        ctx: Context,
+        character: Optional[Character],
+        dice: Dice,
+        base_names: Tuple[str, str, str],
+        talent: int,
+        players: List[str],
+    ):
+        """Rolls the checks of every named player, or the own ones, with their bases."""
+        messages = self.messages(ctx)
+        problem = self.dice_problem(messages, dice, max(len(players), 1))
+        if problem:
+            await ctx.send(problem)
             return
 
-        base = [base1, base2, base3]
-        # _logger.debug(f"Base1: '{base[0]}' Base2: '{base[1]}' Base3: '{base[2]}'")
-
-        results = [random.randint(1, dice.sides) for r in range(dice.number)]
-
-        # successes = sum([1 for r in results if r <= base[0]])
-        # _logger.debug(f"successes: '{successes}'")
-        TaW = talent
-        successes = 0
-        results_out = []
-
-        _logger.debug(f"talent: '{TaW}'")
-        i = -1
-        for r in results:
-            i += 1
-            if r <= base[i]:
-                successes += 1
-                results_out.append(f"**{r}**")
-            else:
-                if r <= base[i] + TaW:
-                    successes += 1
-                    results_out.append(f"**{r}**")
-                    TaW -= r - base[i]
-                else:
-                    results_out.append(str(r))
-                    TaW -= r - base[i]
-        # _logger.debug(f"talent: '{TaW}'")
-        # _logger.debug(f"successes: '{successes}'")
-        success = successes >= 3
-        i = 0
-        for r in results:
-            if r == 1:
-                i += 1
-        if i >= 2:
-            success = 3
-        # _logger.debug(f"success: '{success}'")
-
-        msg = ""
-        KritErf = 0
-        KritMisErf = 0
-
-        if success:
-            for r in results:
-                if r == 1:
-                    KritErf += 1
-            if KritErf >= 2:
-                msg = (
-                    f":fire: :fire: :fire: **Kritischer Erfolg!** :fire: :fire: :fire:"
+        names = []
+        for base_name in base_names:
+            name = self.find_proper_name(base_name)
+            if not name:
+                await ctx.send(messages.render("attribute_unknown", name=base_name))
+                return
+            names.append(name)
+
+        targets = []
+        for player in players:
+            member = ctx.guild.get_member_named(player) if ctx.guild else None
+            if not member:
+                await ctx.send(messages.render("player_not_found", player=player))
+                return
+
+            target = ctx.bot.get_character(member.id)
+            if not target:
+                await ctx.send(
+                    messages.render("player_has_no_character", player=player)
                 )
-            else:
-                msg = f":green_circle: **Erfolg!**"
+                return
+            targets.append(target)
+
+        if not players:
+            if not character:
+                await ctx.send(messages.render("no_player"))
+                return
+            targets.append(character)
+
+        bases = []
+        labels = []
+        for target in targets:
+            values = []
+            for name in names:
+                stat = target.get_attribute(name)
+                if not stat:
+                    await ctx.send(
+                        messages.render(
+                            "attribute_not_found", character=target.name, name=name
+                        )
+                    )
+                    return
+                values.append(stat.value)
+
+            bases.extend([(values[0], values[1], values[2])] * (dice.number // 3))
+            labels.extend([target.name] * (dice.number // 3))
+
+        rolls = self.roll_dice(Dice(f"{len(bases) * 3}d{dice.sides}"))
+        results = evaluate_party_checks(rolls, bases, talent)
+
+        if len(results) == 1:
+            await ctx.send(format_check(messages, ctx.author.mention, results[0]))
         else:
-            for r in results:
-                if r == 20:
-                    KritMisErf += 1
+            await ctx.send(
+                format_check_table(messages, ctx.author.mention, results, names, labels)
+            )
 
-            if KritMisErf >= 2:
-                msg = f":zap: :zap: :zap: **Kritischer Misserfolg!** :zap: :zap: :zap:"
-            else:
-                msg = f":red_circle: **Misserfolg!**"
 
-        dice_msg = ", ".join(results_out)
-        plural = "e"
-        if successes == 1:
-            plural = ""
+def format_check(messages: MessageCatalog, mention: str, result: CheckResult) -> str:
+    dice_msg = ", ".join(
+        f"**{r}**" if passed else str(r)
+        for r, passed in zip(result.rolls, result.passed)
+    )
 
-        await ctx.send(
-            f">>> {ctx.author.mention}\n{msg}\n:game_die: {dice_msg} ({successes} Erfolg{plural}) {TaW}TaW"
+    return messages.render(
+        "dsa.check_result",
+        mention=mention,
+        outcome=messages.render(
+            outcome_key(
+                result.success, result.critical_success or result.critical_failure
+            )
+        ),
+        dice=dice_msg,
+        successes=messages.render("successes", count=result.successes),
+        talent=result.talent,
+    )
+
+
+def format_check_table(
+    messages: MessageCatalog,
+    mention: str,
+    results: List[CheckResult],
+    base: Sequence[Union[int, str]],
+    labels: Optional[List[str]] = None,
+) -> str:
+    # Rows are numbered, unless they're named after the character that rolled them
+    header, align = "#", ">"
+    if labels is None:
+        labels = [str(i) for i in range(1, len(results) + 1)]
+    else:
+        header, align = "", "<"
+    width = max(3, *map(len, labels))
+
+    lines = [messages.render("dsa.check_table_header", label=header.rjust(width))]
+    for label, result in zip(labels, results):
+        rolls = " ".join(f"{r:>2}" for r in result.rolls)
+        outcome = "✓" if result.success else "✗"
+        crit = ""
+        if result.critical_success:
+            crit = "!!"
+        elif result.critical_failure:
+            crit = "??"
+        lines.append(
+            f"{label:{align}{width}} | {rolls} | {outcome:^4} | {result.talent:>3} | {crit}"
         )
+
+    return messages.render(
+        "dsa.check_table",
+        mention=mention,
+        passed=sum(1 for result in results if result.success),
+        total=len(results),
+        base=", ".join(map(str, base)),
+        table="\n".join(lines),
+    )
@@ -1,7 +1,6 @@
-import random
 from typing import List, Tuple, Any, Optional
 from discord.ext.commands import Context
-from .base import BaseSystem, Dice
+from .base import BaseSystem, Dice, outcome_key
 from pnpbot.character import Attribute, Character
 
 
@@ -14,24 +13,26 @@ class System(BaseSystem):
         Attribute(name="Geist", limited=True, spendable=True),
         Attribute(name="Sozial", limited=True, spendable=True),
     ]
-    RollHelp = "Verwendung: !roll XdY Basis (z.B. `!roll 3d20 15`)"
+    RollHelp = "hexdec.roll_help"
+    DefeatAttribute = "Vita"
 
     async def handle_roll(
         self, ctx: Context, character: Optional[Character], dice: Dice, base: int
     ):
+        messages = self.messages(ctx)
         if dice.number <= 0 or dice.sides <= 0:
-            await ctx.send("Verwendung: !roll XdY Basis (e.g. `!roll 3d20 15`")
+            await ctx.send(messages.render("roll_usage"))
             return
 
         if dice.number > 50:
-            await ctx.send("Du kannst maximal 50 Würfel gleichzeitig werfen.")
+            await ctx.send(messages.render("roll_max_dice", count=50))
             return
 
         if dice.sides > 100:
-            await ctx.send("Die Würfel können nicht mehr als 100 Seiten haben.")
+            await ctx.send(messages.render("roll_max_sides"))
             return
 
-        results = [random.randint(1, dice.sides) for r in range(dice.number)]
+        results = self.roll_dice(dice)
         successes = sum([1 for r in results if r > base])
         success = successes > 0
         critical = any([True for r in results if r == 20 or r == 1 and not success])
@@ -43,25 +44,12 @@ class System(BaseSystem):
             else:
                 results_out.append(str(r))
 
-        msg = ""
-        if success:
-            if critical:
-                msg = (
-                    f":fire: :fire: :fire: **Kritischer Erfolg!** :fire: :fire: :fire:"
-                )
-            else:
-                msg = f":green_circle: **Erfolg!**"
-        else:
-            if critical:
-                msg = f":zap: :zap: :zap: **Kritischer Misserfolg!** :zap: :zap: :zap:"
-            else:
-                msg = f":red_circle: **Misserfolg!**"
-
-        dice_msg = ", ".join(results_out)
-        plural = "e"
-        if successes == 1:
-            plural = ""
-
         await ctx.send(
-            f">>> {ctx.author.mention}\n{msg}\n:game_die: {dice_msg} ({successes} Erfolg{plural})"
+            messages.render(
+                "roll_result",
+                mention=ctx.author.mention,
+                outcome=messages.render(outcome_key(success, critical)),
+                dice=", ".join(results_out),
+                successes=messages.render("successes", count=successes),
+            )
         )
@@ -0,0 +1,86 @@
+import logging
+import sys
+
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Optional
+
+from pnpbot.bot import load_system
+from pnpbot.character import Character
+from pnpbot.sheets import SheetFormat, export_sheets, import_sheets, read_sheets
+from pnpbot.storage import StatsFile, load_characters, save_characters
+
+
+def resolve_player(player: str) -> Optional[int]:
+    # Without a Discord connection only user IDs can be resolved
+    return int(player) if player.isdigit() else None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARN,
+        format="%(asctime)s - %(levelname)s [%(filename)s]: %(message)s",
+    )
+    _logger = logging.getLogger("pnpbot")
+    _logger.setLevel(logging.DEBUG)
+    parser = ArgumentParser()
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file")
+    parser.add_argument("--system", required=True)
+    parser.add_argument("--stats", type=Path, default=StatsFile)
+    parser.add_argument("--format", choices=[f.value for f in SheetFormat])
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument(
+        "--if-version",
+        action="store_true",
+        help="Update existing characters still at the version given in the sheet",
+    )
+
+    args = parser.parse_args()
+
+    system = load_system(args.system)
+    characters = load_characters(args.stats)
+    for character in characters.values():
+        system.migrate_character(character)
+    if args.format:
+        sheet_format = SheetFormat(args.format)
+    else:
+        sheet_format = SheetFormat.from_filename(args.file)
+
+    if args.command == "export":
+        with open(args.file, "w", encoding="utf-8", newline="") as stream:
+            stream.writelines(
+                export_sheets(characters, system.attribute_names(), sheet_format)
+            )
+        _logger.info(f"Exported {len(characters)} characters to {args.file}")
+        sys.exit(0)
+
+    def commit(entries):
+        for user_id, name, attributes in entries:
+            characters[user_id] = Character(name, attributes)
+        save_characters(characters, args.stats)
+
+    def patch(user_id, version, values):
+        characters[user_id].apply_patch(version, values)
+
+    with open(args.file, encoding="utf-8-sig", newline="") as stream:
+        report = import_sheets(
+            system,
+            read_sheets(stream, sheet_format),
+            resolve_player,
+            commit,
+            existing=characters,
+            chunk_size=args.chunk_size,
+            patch=patch if args.if_version else None,
+        )
+
+    if report.updated:
+        save_characters(characters, args.stats)
+
+    for error in report.errors:
+        _logger.warning(str(error))
+    _logger.info(
+        f"Imported {report.imported} and updated {report.updated} characters, "
+        f"{len(report.errors)} errors"
+    )
+    sys.exit(1 if report.errors else 0)
@@ -7,9 +7,34 @@ from pnpbot.character import (
     OverflowAttributeException,
 )
 
+InvalidValues = ["a", "a/b", "a/b/c", "=", "x=", "x=5/", "x=1.5", "x==5", "x=5=6"]
+OutOfRangeValues = [
+    ("x=5/3", OverflowAttributeException),
+    ("x=1/0/5", UnderflowAttributeException),
+]
+SingleValues = [
+    ("", "5"),
+    ("strength", "strength=5"),
+    ("Stärke", " Stärke = 5 "),
+    ("MU", "MU=+5"),
+]
+CurrentMaximumValues = [("", "5/10"), ("strength", "strength=5/10"), ("x", "x= 5 / 10")]
+MinimumCurrentMaximumValues = [("", "2/5/10"), ("strength", "strength=2/5/10")]
+
+# Every text parsed here, which the parsing benchmark also uses as its input
+AttributeInputs = (
+    InvalidValues
+    + ["10/0/5", "x=1/2/3/4"]
+    + [text for text, _ in OutOfRangeValues]
+    + [
+        text
+        for _, text in SingleValues + CurrentMaximumValues + MinimumCurrentMaximumValues
+    ]
+)
+
 
 class TestAttributes:
-    @pytest.mark.parametrize("input", ["a", "a/b", "a/b/c"])
+    @pytest.mark.parametrize("input", InvalidValues)
     def test_invalid_value(self, input: str):
         with pytest.raises(AttributeParseException):
             attr = Attribute.from_str(input)
@@ -18,7 +43,16 @@ class TestAttributes:
         with pytest.raises(AttributeParseException):
             attr = Attribute.from_str("10/0/5")
 
-    @pytest.mark.parametrize("name, input", [("", "5"), ("strength", "strength=5")])
+    def test_too_many_values(self):
+        with pytest.raises(AttributeParseException):
+            Attribute.from_str("x=1/2/3/4")
+
+    @pytest.mark.parametrize("input, exception", OutOfRangeValues)
+    def test_out_of_range(self, input: str, exception: type):
+        with pytest.raises(exception):
+            Attribute.from_str(input)
+
+    @pytest.mark.parametrize("name, input", SingleValues)
     def test_single_value(self, name: str, input: str):
         attr = Attribute.from_str(input)
 
@@ -28,9 +62,7 @@ class TestAttributes:
         assert attr.minimum == 0
         assert attr.maximum == 0
 
-    @pytest.mark.parametrize(
-        "name, input", [("", "5/10"), ("strength", "strength=5/10")]
-    )
+    @pytest.mark.parametrize("name, input", CurrentMaximumValues)
     def test_current_maximum(self, name: str, input: str):
         attr = Attribute.from_str(input)
 
@@ -40,9 +72,7 @@ class TestAttributes:
         assert attr.minimum == 0
         assert attr.maximum == 10
 
-    @pytest.mark.parametrize(
-        "name, input", [("", "2/5/10"), ("strength", "strength=2/5/10")]
-    )
+    @pytest.mark.parametrize("name, input", MinimumCurrentMaximumValues)
     def test_minimum_current_maximum(self, name: str, input: str):
         attr = Attribute.from_str(input)
 
@@ -1,4 +1,31 @@
-from pnpbot.character import Attribute, Character
+import pickle
+import pytest
+from pnpbot.character import (
+    Attribute,
+    Character,
+    Formula,
+    FormulaCycleException,
+    FormulaParseException,
+    OverflowAttributeException,
+    VersionConflictException,
+)
+
+
+def make_character() -> Character:
+    return Character(
+        "Test",
+        [
+            Attribute(name="KO", value=12, spendable=True),
+            Attribute(name="KK", value=13),
+            Attribute(name="Bonus", formula=Formula("KO // 4")),
+            Attribute(
+                name="LeP",
+                limited=True,
+                spendable=True,
+                formula=Formula("(ko + KO + KK) / 2 + bonus"),
+            ),
+        ],
+    )
 
 
 class TestCharacter:
@@ -11,3 +38,90 @@ class TestCharacter:
         assert c.has_attribute("Test") == True
         assert c.get_attribute("test") == attr
         assert "test" in c.attributes
+
+    @pytest.mark.parametrize("expression", ["KO +", "__import__('os')", "KO.x", "1.5"])
+    def test_invalid_formula(self, expression: str):
+        with pytest.raises(FormulaParseException):
+            Formula(expression)
+
+    def test_formula_rounding(self):
+        assert Formula("a / 2").evaluate({"a": 37}) == 19
+        assert Formula("a / 2").evaluate({"a": 36}) == 18
+
+    def test_derived_attributes(self):
+        c = make_character()
+
+        assert c.derived_order == ["bonus", "lep"]
+        assert c.get_attribute("Bonus").value == 3
+        assert c.get_attribute("LeP").maximum == 22
+        assert c.get_attribute("LeP").value == 22
+
+    def test_derived_recompute(self):
+        c = make_character()
+        c.spend("LeP", 5)
+        c.gain("KO", 4)
+
+        lep = c.get_attribute("LeP")
+        assert c.get_attribute("Bonus").value == 4
+        assert lep.maximum == 27
+        assert lep.value == 17
+
+    def test_derived_update(self):
+        c = make_character()
+        c.update("LeP", Attribute(value=10, maximum=99, limited=True))
+
+        lep = c.get_attribute("LeP")
+        assert lep.value == 10
+        assert lep.maximum == 22
+
+    def test_only_dependents_recomputed(self):
+        c = make_character()
+        assert c.dependents["kk"] == ["lep"]
+        assert "lep" not in c.dependents
+
+    def test_cycle(self):
+        with pytest.raises(FormulaCycleException):
+            Character(
+                "Test",
+                [
+                    Attribute(name="A", formula=Formula("B")),
+                    Attribute(name="B", formula=Formula("A")),
+                ],
+            )
+
+    def test_pickle(self):
+        c = pickle.loads(pickle.dumps(make_character()))
+        c.gain("KO", 4)
+        assert c.get_attribute("LeP").maximum == 27
+
+    def test_versions(self):
+        c = make_character()
+        assert c.version == 0
+
+        c.spend("LeP", 5)
+        c.gain("KO", 0)
+        c.update("KK", 15)
+        assert c.version == 2
+        assert [stat.name for stat in c.changes_since(0)] == ["KK", "LeP"]
+        assert [stat.name for stat in c.changes_since(1)] == ["KK", "LeP"]
+        assert c.get_attribute("LeP").version == 2
+        assert c.changes_since(2) == []
+
+    def test_patch(self):
+        c = make_character()
+        c.spend("LeP", 5)
+
+        with pytest.raises(VersionConflictException):
+            c.apply_patch(0, {"KO": 10})
+
+        assert c.apply_patch(1, {"KO": 16, "KK": 13}) == 2
+        assert [stat.name for stat in c.changes_since(1)] == ["KO", "Bonus", "LeP"]
+
+    def test_patch_atomic(self):
+        c = make_character()
+        with pytest.raises(OverflowAttributeException):
+            c.apply_patch(0, {"KO": 16, "LeP": 99})
+
+        assert c.version == 0
+        assert c.get_attribute("KO").value == 12
+        assert c.changes_since(0) == []
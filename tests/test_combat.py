@@ -0,0 +1,114 @@
+import pytest
+from pnpbot.character import Attribute, Character
+from pnpbot.combat import Combat, Combatant, DuplicateCombatantException
+
+
+def make_combatant(name: str, initiative: int, user_id=None) -> Combatant:
+    character = Character(
+        name,
+        [
+            Attribute(name="LeP", value=10, maximum=10, limited=True, spendable=True),
+            Attribute(name="AsP", value=5, maximum=5, limited=True, spendable=True),
+        ],
+    )
+    return Combatant(name, character, initiative, user_id)
+
+
+class TestCombat:
+    def test_turn_order(self):
+        combat = Combat()
+        for name, initiative in [("A", 5), ("B", 12), ("C", 8)]:
+            combat.add(make_combatant(name, initiative))
+
+        turns = [combat.next_turn() for _ in range(4)]
+        assert [c.name for c, _ in turns] == ["B", "C", "A", "B"]
+        assert [new_round for _, new_round in turns] == [True, False, False, True]
+        assert combat.round == 2
+
+    def test_late_join(self):
+        combat = Combat()
+        combat.add(make_combatant("A", 5))
+        combat.next_turn()
+        combat.add(make_combatant("B", 3))
+
+        combatant, new_round = combat.next_turn()
+        assert combatant.name == "B"
+        assert not new_round
+
+    def test_find(self):
+        combat = Combat()
+        for name in ["Goblin1", "Goblin2", "Alrik"]:
+            combat.add(make_combatant(name, 1))
+
+        assert len(combat.find("goblin*")) == 2
+        assert combat.find("ALRIK")[0].name == "Alrik"
+        assert combat.find("Boron") == []
+
+    def test_rejoin_keeps_turn(self):
+        combat = Combat()
+        combat.add(make_combatant("A", 5, user_id=1))
+        combat.add(make_combatant("B", 3))
+        combat.next_turn()
+        combat.add(make_combatant("A", 1, user_id=1))
+
+        turns = [combat.next_turn() for _ in range(3)]
+        assert [c.name for c, _ in turns] == ["B", "B", "A"]
+        assert [new_round for _, new_round in turns] == [False, True, False]
+
+    def test_duplicate_name(self):
+        combat = Combat()
+        player = make_combatant("Alrik", 5, user_id=1)
+        combat.add(player)
+        combat.add(make_combatant("Goblin", 3))
+
+        for duplicate in [
+            make_combatant("alrik", 20),
+            make_combatant("Alrik", 20, user_id=2),
+            make_combatant("GOBLIN", 20),
+        ]:
+            with pytest.raises(DuplicateCombatantException):
+                combat.add(duplicate)
+
+        assert combat.find("alrik") == [player]
+        assert [c.initiative for c in combat.order()] == [5, 3]
+
+    def test_bulk_damage(self):
+        combat = Combat(defeat_attribute="LeP")
+        for name, initiative in [("A", 5), ("B", 12)]:
+            combat.add(make_combatant(name, initiative))
+
+        changed = combat.apply_damage(combat.find("*"), 12, "LeP")
+        assert len(changed) == 2
+        assert all(c.defeated for c in changed)
+        assert all(c.character.get_attribute("LeP").value == 0 for c in changed)
+        assert combat.next_turn() == (None, False)
+
+    def test_defeated_skipped(self):
+        combat = Combat(defeat_attribute="LeP")
+        for name, initiative in [("A", 5), ("B", 12)]:
+            combat.add(make_combatant(name, initiative))
+
+        combat.next_turn()
+        combat.apply_damage(combat.find("A"), 10, "LeP")
+        combatant, new_round = combat.next_turn()
+        assert combatant.name == "B"
+        assert new_round
+        assert "kampfunfähig" in combat.summary()
+
+    def test_defeat_attribute_only(self):
+        combat = Combat(defeat_attribute="LeP")
+        combat.add(make_combatant("A", 5))
+
+        combat.apply_damage(combat.find("A"), 5, "AsP")
+        assert not combat.find("A")[0].defeated
+
+    def test_healed(self):
+        combat = Combat(defeat_attribute="LeP")
+        combat.add(make_combatant("A", 5))
+
+        combat.apply_damage(combat.find("A"), 10, "LeP")
+        assert combat.find("A")[0].defeated
+
+        combat.apply_damage(combat.find("A"), -3, "LeP")
+        assert not combat.find("A")[0].defeated
+        assert combat.next_turn()[0].name == "A"
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+
+from pnpbot.character import Attribute, Character
+from pnpbot.effects import Effect, EffectScheduler, apply_effects, parse_interval
+from pnpbot.messages import get_catalog
+
+
+class FakeChannel:
+    guild = None
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class FakeBot:
+    def __init__(self, loop):
+        self.loop = loop
+        self.characters = {1: make_character("Alrik"), 2: make_character("Bosper")}
+        self.commits = []
+        self.play_channel = FakeChannel()
+
+    async def commit(self, *user_ids):
+        self.commits.append(user_ids)
+
+    def messages(self, guild):
+        return get_catalog()
+
+
+def make_character(name: str) -> Character:
+    return Character(
+        name,
+        [
+            Attribute(name="LeP", value=8, maximum=10, limited=True, spendable=True),
+            Attribute(name="MU", value=12),
+        ],
+    )
+
+
+class TestEffects:
+    def test_parse_interval(self):
+        assert parse_interval("30s") == ("seconds", 30)
+        assert parse_interval("5m") == ("seconds", 300)
+        assert parse_interval("2r") == ("rounds", 2)
+        assert parse_interval("Rest") == ("rest", 1)
+
+    @pytest.mark.parametrize("times", [0, -1])
+    def test_times_at_least_once(self, times: int):
+        with pytest.raises(ValueError):
+            Effect(1, "LeP", 1, "1m", times=times)
+
+    def test_apply_clamped(self):
+        characters = {1: make_character("Alrik")}
+        effects = [
+            Effect(1, "LeP", 5, "1m"),
+            Effect(1, "MU", 1, "1m"),
+            Effect(1, "LeP", -3, "1m", times=1),
+        ]
+        lines, changed = apply_effects(characters, effects, get_catalog())
+
+        assert characters[1].get_attribute("LeP").value == 7
+        assert changed == [1]
+        assert len(lines) == 3
+        assert [e.cancelled for e in effects] == [False, True, True]
+
+    def test_timed_batch(self):
+        loop = asyncio.new_event_loop()
+        bot = FakeBot(loop)
+        scheduler = EffectScheduler(bot)
+        assert scheduler.timer is None
+
+        scheduler.add(Effect(1, "LeP", 1, "1s", times=1))
+        scheduler.add(Effect(2, "LeP", -2, "1s", times=1))
+        assert scheduler.timer is not None
+
+        loop.run_until_complete(asyncio.sleep(1.1))
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+        assert bot.characters[1].get_attribute("LeP").value == 9
+        assert bot.characters[2].get_attribute("LeP").value == 6
+        assert bot.commits == [(1, 2)]
+        assert len(bot.play_channel.sent) == 1
+        # Nothing left to do, so no timer stays armed
+        assert scheduler.timer is None
+        assert scheduler.effects() == []
+
+    def test_failed_tick_rearms(self, caplog):
+        loop = asyncio.new_event_loop()
+        bot = FakeBot(loop)
+        scheduler = EffectScheduler(bot)
+
+        async def failing_commit(*user_ids):
+            raise OSError("disk full")
+
+        bot.commit = failing_commit
+        scheduler.add(Effect(1, "LeP", 1, "1s"))
+        loop.run_until_complete(asyncio.sleep(1.1))
+        loop.run_until_complete(asyncio.sleep(0))
+
+        assert "Saving the effects of 1 players failed" in caplog.text
+        # Nothing is announced that wasn't stored
+        assert bot.play_channel.sent == []
+        # The effect is due again and the timer armed for it
+        assert scheduler.timer is not None
+        assert len(scheduler.effects()) == 1
+        scheduler.close()
+        loop.close()
+
+    def test_rounds_and_rest(self):
+        loop = asyncio.new_event_loop()
+        bot = FakeBot(loop)
+        scheduler = EffectScheduler(bot)
+        messages = get_catalog()
+
+        scheduler.add(Effect(1, "LeP", -1, "2r", channel_id=5))
+        scheduler.add(Effect(2, "LeP", 1, "rest"))
+
+        def round_passed(channel_id: int):
+            return loop.run_until_complete(scheduler.round_passed(channel_id, messages))
+
+        assert round_passed(5) is None
+        assert round_passed(5) is not None
+        assert round_passed(6) is None
+        assert bot.characters[1].get_attribute("LeP").value == 7
+
+        scheduler.fight_ended(5)
+        assert loop.run_until_complete(scheduler.rest(messages)) is not None
+        assert bot.commits == [(1,), (2,)]
+        assert scheduler.clear(2) == 1
+        assert scheduler.effects() == []
+        assert scheduler.timer is None
+        loop.close()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+import pytest
+from pnpbot.executor import (
+    ComputeExecutor,
+    ComputeBusyException,
+    ComputeFailedException,
+    ComputeQueueFullException,
+    ComputeTimeoutException,
+)
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def crash(code: int) -> int:
+    os._exit(code)
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+class TestExecutor:
+    def test_submit(self):
+        executor = ComputeExecutor(workers=1)
+        try:
+            assert run(executor.submit(1, square, 4)) == 16
+            assert executor.pending == 0
+            assert executor.per_user == {}
+        finally:
+            executor.shutdown()
+
+    def test_cache(self):
+        executor = ComputeExecutor(workers=1, cache_size=1)
+        try:
+            run(executor.submit(1, square, 4))
+            assert len(executor.cache) == 1
+
+            # Cached results don't need the pool anymore
+            executor.shutdown()
+            executor.pending = executor.max_pending
+            assert run(executor.submit(1, square, 4)) == 16
+        finally:
+            executor.shutdown()
+
+    def test_queue_full(self):
+        executor = ComputeExecutor(max_pending=0)
+        with pytest.raises(ComputeQueueFullException):
+            run(executor.submit(1, square, 4))
+
+    def test_per_user(self):
+        executor = ComputeExecutor(workers=1, max_per_user=1)
+
+        async def both():
+            first = asyncio.ensure_future(executor.submit(1, sleep, 0.2))
+            await asyncio.sleep(0)
+            with pytest.raises(ComputeBusyException):
+                await executor.submit(1, sleep, 0.1)
+            assert await executor.submit(2, square, 3) == 9
+            return await first
+
+        try:
+            assert run(both()) == 0.2
+        finally:
+            executor.shutdown()
+
+    def test_timeout(self):
+        executor = ComputeExecutor(workers=1, timeout=0.1)
+        try:
+            with pytest.raises(ComputeTimeoutException):
+                run(executor.submit(1, sleep, 1))
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    def test_timeout_frees_worker(self):
+        executor = ComputeExecutor(workers=1, timeout=0.5)
+        try:
+            with pytest.raises(ComputeTimeoutException):
+                run(executor.submit(1, sleep, 2))
+
+            # The runaway job must not keep the only worker busy
+            assert run(executor.submit(1, sleep, 0.01)) == 0.01
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    def test_crashed_worker(self):
+        executor = ComputeExecutor(workers=1)
+        try:
+            # The job takes its worker down on the retry as well
+            with pytest.raises(ComputeFailedException):
+                run(executor.submit(1, crash, 1))
+            assert executor.pending == 0
+
+            # A broken pool is replaced instead of failing every later job
+            assert run(executor.submit(1, square, 5)) == 25
+        finally:
+            executor.shutdown()
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from pnpbot.fairness import (
+    RngBackends,
+    chi_square,
+    gamma_q,
+    hexdec_outcomes,
+    kolmogorov_smirnov,
+    run_fairness,
+)
+from pnpbot.systems import dsa, hexdec
+from pnpbot.systems.base import Dice
+
+
+class LoadedRandom(random.Random):
+    def choices(self, population, weights=None, *, cum_weights=None, k=1):
+        # Every fourth die shows the highest face
+        results = super().choices(population, k=k)
+        return [population[-1] if i % 4 == 0 else r for i, r in enumerate(results)]
+
+
+class TestFairness:
+    def test_chi_square_p_value(self):
+        # Critical values of the chi-square distribution at 5%
+        assert gamma_q(0.5, 3.841 / 2) == pytest.approx(0.05, abs=1e-4)
+        assert gamma_q(9.5, 30.144 / 2) == pytest.approx(0.05, abs=1e-4)
+        assert chi_square([50, 50], [0.5, 0.5]).p_value == pytest.approx(1.0)
+        assert chi_square([1, 99], [0.0, 1.0]).p_value == 0.0
+
+    def test_kolmogorov_smirnov(self):
+        assert kolmogorov_smirnov([100, 100], [0.5, 0.5]).p_value == 1.0
+        assert kolmogorov_smirnov([200, 0], [0.5, 0.5]).p_value < 1e-6
+
+    def test_hexdec_outcomes(self):
+        outcomes = hexdec_outcomes(Dice("1d20"), 10)
+        assert outcomes == pytest.approx(
+            {
+                "critical_success": 0.05,
+                "success": 0.45,
+                "failure": 0.45,
+                "critical_failure": 0.05,
+            }
+        )
+
+    @pytest.mark.parametrize(
+        "name,system,args",
+        [("hexdec", hexdec.System, (10,)), ("dsa", dsa.System, (12, 11, 13, 4))],
+    )
+    def test_fair(self, name, system, args):
+        report = run_fairness(
+            name, system(), "mersenne", 5000, Dice("3d20"), *args, seed=1
+        )
+
+        assert report.rolls == sum(report.outcome_counts.values()) == 5000
+        assert report.faces.p_value > 0.001
+        assert report.faces_ks.p_value > 0.001
+        assert report.outcomes.p_value > 0.001
+
+    def test_records_through_the_generator(self):
+        system = hexdec.System()
+        report = run_fairness("hexdec", system, "mersenne", 100, Dice("2d20"), 10)
+
+        # The faces are counted by the generator, the roll path stays the system's own
+        assert "roll_dice" not in vars(system)
+        assert report.rolls == 100
+
+    def test_loaded_dice(self, monkeypatch):
+        monkeypatch.setitem(RngBackends, "loaded", LoadedRandom)
+        report = run_fairness(
+            "hexdec", hexdec.System(), "loaded", 5000, Dice("3d20"), 10, seed=1
+        )
+
+        assert report.faces.p_value < 1e-6
+        assert report.faces_ks.p_value < 1e-6
+        assert report.outcomes.p_value < 1e-6
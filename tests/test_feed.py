@@ -0,0 +1,189 @@
+import asyncio
+import json
+from pnpbot.bot import PnPBot
+from pnpbot.character import Attribute, Character
+from pnpbot.feed import ChangeFeed
+from pnpbot.storage import PickleStorage
+
+
+def make_character() -> Character:
+    return Character(
+        "Alrik",
+        [
+            Attribute(name="LeP", value=10, maximum=10, limited=True, spendable=True),
+            Attribute(name="MU", value=12),
+        ],
+    )
+
+
+class TestFeed:
+    def test_delta(self):
+        feed = ChangeFeed()
+        character = make_character()
+        feed.reset({1: character})
+
+        snapshot, queue = feed.subscribe()
+        # The reset itself was published as a snapshot event
+        assert snapshot["seq"] == 1
+        assert snapshot["characters"][1]["attributes"]["LeP"]["value"] == 10
+
+        character.spend("LeP", 3)
+        feed.character_updated(1, character)
+        feed.character_updated(1, character)
+        feed.character_deleted(1)
+
+        update = queue.get_nowait()
+        assert update["seq"] == 2
+        assert list(update["attributes"]) == ["LeP"]
+        assert update["attributes"]["LeP"]["value"] == 7
+        assert queue.get_nowait() == {"type": "delete", "player": 1, "seq": 3}
+        assert queue.empty()
+
+    def test_slow_observer_dropped(self):
+        feed = ChangeFeed(max_backlog=1)
+        character = make_character()
+        _, queue = feed.subscribe()
+
+        feed.character_updated(1, character)
+        character.spend("LeP", 1)
+        feed.character_updated(1, character)
+
+        assert feed.subscribers == set()
+        assert queue.get_nowait()["seq"] == 1
+        assert queue.get_nowait() is None
+
+    def test_socket(self, tmp_path):
+        path = str(tmp_path / "feed.sock")
+        feed = ChangeFeed()
+        character = make_character()
+        feed.reset({1: character})
+
+        async def observe():
+            await feed.serve(path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            snapshot = json.loads(await reader.readline())
+
+            character.gain("LeP", 0)
+            character.update("MU", 13)
+            feed.character_updated(1, character)
+            update = json.loads(await reader.readline())
+
+            feed.close()
+            writer.close()
+            return snapshot, update
+
+        snapshot, update = asyncio.new_event_loop().run_until_complete(observe())
+        assert snapshot["characters"]["1"]["name"] == "Alrik"
+        assert update["version"] == 1
+        assert update["attributes"] == {
+            "MU": {
+                "value": 13,
+                "minimum": 0,
+                "maximum": 0,
+                "limited": False,
+                "version": 1,
+            }
+        }
+
+    def test_connected_before_load(self, tmp_path):
+        path = str(tmp_path / "feed.sock")
+        feed = ChangeFeed()
+
+        async def observe():
+            await feed.serve(path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            empty = json.loads(await reader.readline())
+
+            feed.reset({1: make_character()})
+            loaded = json.loads(await reader.readline())
+
+            feed.close()
+            writer.close()
+            return empty, loaded
+
+        empty, loaded = asyncio.new_event_loop().run_until_complete(observe())
+        assert empty == {"type": "snapshot", "seq": 0, "characters": {}}
+        assert loaded["type"] == "snapshot"
+        assert loaded["seq"] == 1
+        assert loaded["characters"]["1"]["attributes"]["LeP"]["value"] == 10
+
+    def test_requests(self, tmp_path):
+        storage = PickleStorage(tmp_path / "stats.pickle", tmp_path / "locales.json")
+        bot = PnPBot(
+            "hexdec",
+            0,
+            str(tmp_path / "feed.sock"),
+            storage=storage,
+            feed_token="secret",
+        )
+
+        async def requests():
+            await bot.wait_for_stats()
+            await bot.add_character(
+                1, "Alrik", list(make_character().attributes.values())
+            )
+
+            patch = {"type": "patch", "player": 1, "version": 0, "values": {"MU": 13}}
+            unauthorized = await bot.feed.answer(dict(patch, token="guess"))
+            patched = await bot.feed.answer(dict(patch, token="secret"))
+            conflict = await bot.feed.answer(
+                dict(patch, id=7, values={}, token="secret")
+            )
+            await bot.save_stats()
+            changes = await bot.feed.answer(
+                {"type": "changes", "player": 1, "since": 0}
+            )
+            await bot.close()
+            return unauthorized, patched, conflict, changes
+
+        unauthorized, patched, conflict, changes = bot.loop.run_until_complete(
+            requests()
+        )
+        assert unauthorized == {"type": "error", "error": "unauthorized"}
+        assert patched == {"type": "patched", "player": 1, "version": 1}
+        assert conflict == {
+            "type": "error",
+            "error": "version_conflict",
+            "version": 1,
+            "id": 7,
+        }
+        assert changes["version"] == 1
+        assert list(changes["attributes"]) == ["MU"]
+
+        # The versions survive the commit, so observers can resume after a restart
+        reloaded = storage.load_characters()[1]
+        assert reloaded.version == 1
+        assert [stat.name for stat in reloaded.changes_since(0)] == ["MU"]
+
+    def test_read_only_without_token(self):
+        async def handler(request: dict) -> dict:
+            return {"type": "patched"}
+
+        feed = ChangeFeed(request_handler=handler)
+        patch = {"type": "patch", "player": 1, "token": ""}
+
+        answer = asyncio.new_event_loop().run_until_complete(feed.answer(patch))
+        assert answer == {"type": "error", "error": "unauthorized"}
+
+    def test_observer_hangs_up(self, tmp_path):
+        path = str(tmp_path / "feed.sock")
+        feed = ChangeFeed()
+
+        async def observe():
+            await feed.serve(path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            await reader.readline()
+            assert len(feed.subscribers) == 1
+
+            # No event follows, the hang up alone has to end the subscription
+            writer.close()
+            for _ in range(100):
+                if not feed.subscribers:
+                    break
+                await asyncio.sleep(0.01)
+
+            subscribers = len(feed.subscribers)
+            feed.close()
+            return subscribers
+
+        assert asyncio.new_event_loop().run_until_complete(observe()) == 0
@@ -0,0 +1,40 @@
+import pytest
+from pnpbot.messages import (
+    Catalogs,
+    MessageCatalog,
+    Template,
+    UnknownLocaleException,
+    get_catalog,
+)
+
+
+class TestMessages:
+    def test_plural(self):
+        messages = get_catalog("de")
+        assert messages.render("successes", count=1) == "1 Erfolg"
+        assert messages.render("successes", count=0) == "0 Erfolge"
+        assert get_catalog("en").render("successes", count=3) == "3 successes"
+
+    def test_constant(self):
+        template = Template("Kein Platzhalter")
+        assert template.constant == "Kein Platzhalter"
+        assert template.render() is template.constant
+
+    def test_fallback(self):
+        messages = get_catalog("en")
+        assert messages.render("spend_done", character="A", value=3, name="LeP")
+
+    def test_cached(self):
+        assert get_catalog("en") is get_catalog("en")
+
+    def test_unknown_locale(self):
+        with pytest.raises(UnknownLocaleException):
+            MessageCatalog("xx")
+
+    @pytest.mark.parametrize("locale", sorted(Catalogs))
+    def test_keys_known(self, locale: str):
+        assert set(Catalogs[locale]) <= set(Catalogs["de"])
+
+    def test_usage_translated(self):
+        usage = [key for key in Catalogs["de"] if key.endswith("usage")]
+        assert [key for key in usage if key not in Catalogs["en"]] == []
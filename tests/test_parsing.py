@@ -0,0 +1,73 @@
+import pytest
+from pnpbot.character import (
+    Attribute,
+    AttributeParseException,
+    AnonymousAttributeException,
+    MissingAttributesException,
+    UnknownAttributeException,
+)
+from pnpbot.systems.dsa import System
+from benchmarks.parse_attributes import describe, legacy_from_str
+from tests.test_attributes import AttributeInputs
+
+DSASheet = [
+    "MU=12",
+    "KL=11",
+    "IN=13",
+    "CH=10",
+    "FF=9",
+    "GE=14",
+    "KO=12",
+    "KK=13",
+    "AsP=0",
+    "KaP=0",
+]
+
+
+class TestParsing:
+    @pytest.mark.parametrize("text", AttributeInputs)
+    def test_matches_legacy(self, text: str):
+        # The from_str before the single-pass validator is the reference
+        assert describe(Attribute.from_str, text) == describe(legacy_from_str, text)
+
+    def test_golden_sheet(self):
+        attributes, errors = System().validate_attributes(
+            [text.lower() for text in DSASheet]
+        )
+
+        assert errors == []
+        assert [a.name for a in attributes] == [
+            "MU",
+            "KL",
+            "IN",
+            "CH",
+            "FF",
+            "GE",
+            "KO",
+            "KK",
+            "AsP",
+            "KaP",
+            "LeP",
+            "Aus",
+        ]
+
+    def test_golden_malformed_sheet(self):
+        attributes, errors = System().validate_attributes(
+            DSASheet[2:] + ["MU=x", "=3", "Mana=5", "KL=9/3"]
+        )
+
+        # The eight valid ones, plus LeP and Aus which are derived
+        assert len(attributes) == 10
+        assert [type(e) for e in errors] == [
+            AttributeParseException,
+            AnonymousAttributeException,
+            UnknownAttributeException,
+            AttributeParseException,
+        ]
+        assert [errors[0].stat_name, errors[3].stat_name] == ["MU", "KL"]
+
+    def test_golden_incomplete_sheet(self):
+        _, errors = System().validate_attributes(DSASheet[1:-1])
+
+        assert [type(e) for e in errors] == [MissingAttributesException]
+        assert errors[0].missing == ["MU", "KaP"]
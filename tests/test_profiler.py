@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from collections import Counter
+
+from pnpbot.profiler import ProfileReport, SamplingProfiler
+
+
+def busy_wait(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiler:
+    def test_blocking_callback(self):
+        profiler = SamplingProfiler(interval=0.001, slow_threshold=0.05)
+
+        async def main():
+            profiler.start()
+            await asyncio.sleep(0.02)
+            busy_wait(0.2)
+            await asyncio.sleep(0.02)
+            return profiler.stop(), asyncio.get_event_loop().get_debug()
+
+        report, debug = asyncio.new_event_loop().run_until_complete(main())
+
+        assert not debug
+        assert not profiler.running
+        assert 0 < report.busy_samples <= report.samples
+
+        function, own, total = report.top_functions(1)[0]
+        assert function.startswith("busy_wait (test_profiler.py:")
+        assert own <= total
+
+        # Spotted by the samples alone, the loop stays out of debug mode
+        assert len(report.slow_callbacks) == 1
+        assert report.slow_callbacks[0].startswith("main (test_profiler.py:")
+
+    def test_collapsed(self):
+        stacks = Counter()
+        stacks[(("a.py", 1, "outer"), ("b.py", 2, "inner"))] += 3
+        stacks[(("a.py", 1, "outer"), ("selectors.py", 3, "select"))] += 5
+
+        report = ProfileReport(1.0, stacks, [])
+        assert report.samples == 8
+        assert report.busy_samples == 3
+        assert report.collapsed().splitlines() == [
+            "outer (a.py:1);select (selectors.py:3) 5",
+            "outer (a.py:1);inner (b.py:2) 3",
+        ]
+        assert report.top_functions() == [("inner (b.py:2)", 3, 3)]
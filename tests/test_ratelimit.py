@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from pnpbot.ratelimit import (
+    CommandRateLimiter,
+    RateLimitedException,
+    RateLimiter,
+    subcommand_follows,
+)
+
+
+def make_context(
+    content: str, user: int = 1, channel: int = 10, guild: Optional[int] = 100
+):
+    return SimpleNamespace(
+        author=SimpleNamespace(id=user),
+        channel=SimpleNamespace(id=channel),
+        guild=SimpleNamespace(id=guild) if guild is not None else None,
+        message=SimpleNamespace(content=content),
+        command=SimpleNamespace(qualified_name=content.split()[0][1:]),
+    )
+
+
+class TestRateLimiter:
+    def test_refill(self):
+        limiter = RateLimiter(rate=1.0, capacity=2)
+        for _ in range(2):
+            assert limiter.retry_after("a", 1, now=0.0) == 0
+            limiter.consume("a", 1)
+
+        assert limiter.retry_after("a", 1, now=0.0) == pytest.approx(1.0)
+        assert limiter.retry_after("a", 1, now=1.0) == 0
+
+    def test_expiry(self):
+        limiter = RateLimiter(rate=1.0, capacity=2)
+        limiter.retry_after("a", 1, now=0.0)
+        limiter.retry_after("b", 1, now=1.5)
+
+        limiter.expire(now=2.0)
+        assert list(limiter.buckets) == ["b"]
+
+
+class TestCommandRateLimiter:
+    def test_cost(self):
+        limiter = CommandRateLimiter()
+        assert limiter.command_cost(make_context("!stats")) == 1.0
+        assert limiter.command_cost(make_context("!odds 12 12 12 5")) == 3.0
+        assert limiter.command_cost(make_context("!roll 30d6")) == pytest.approx(4.0)
+        assert limiter.command_cost(make_context("!roll foo")) == 1.0
+
+    def test_user_limited(self):
+        limiter = CommandRateLimiter(user=(1.0, 3))
+        limiter.check(make_context("!odds 12 12 12 5"), now=0.0)
+
+        with pytest.raises(RateLimitedException) as e:
+            limiter.check(make_context("!stats"), now=0.0)
+        assert e.value.scope == "user"
+        assert e.value.retry_after == pytest.approx(1.0)
+
+        # Other users are unaffected
+        limiter.check(make_context("!stats", user=2), now=0.0)
+
+    def test_atomic(self):
+        limiter = CommandRateLimiter(user=(1.0, 5), channel=(1.0, 2))
+        limiter.check(make_context("!stats", user=1), now=0.0)
+        limiter.check(make_context("!stats", user=2), now=0.0)
+
+        with pytest.raises(RateLimitedException) as e:
+            limiter.check(make_context("!stats", user=1), now=0.0)
+        assert e.value.scope == "channel"
+
+        # The rejected command took nothing from the user's bucket
+        user_limiter = limiter.scopes[0][1]
+        assert user_limiter.buckets[1].tokens == pytest.approx(4.0)
+
+    def test_direct_messages(self):
+        limiter = CommandRateLimiter(guild=(1.0, 2))
+        limiter.check(make_context("!stats", user=1, channel=1, guild=None), now=0.0)
+        limiter.check(make_context("!stats", user=2, channel=2, guild=None), now=0.0)
+
+        # Every DM user only pays into their own buckets
+        limiter.check(make_context("!stats", user=3, channel=3, guild=None), now=0.0)
+        assert None not in limiter.scopes[2][1].buckets
+
+    def test_expensive_command(self):
+        limiter = CommandRateLimiter(user=(1.0, 5))
+        limiter.check(make_context("!roll 100d6"), now=0.0)
+
+        with pytest.raises(RateLimitedException):
+            limiter.check(make_context("!roll 1d6"), now=0.0)
+
+
+@commands.group()
+async def combat(ctx):
+    pass
+
+
+@combat.command(name="next")
+async def next_(ctx):
+    pass
+
+
+def make_invocation(content: str, command: commands.Command):
+    view = StringView(content)
+    view.skip_string("!")
+    view.get_word()
+    return SimpleNamespace(command=command, view=view)
+
+
+class TestRateLimitedCog:
+    def test_subcommand_pays(self):
+        assert subcommand_follows(make_invocation("!combat next", combat))
+        assert not subcommand_follows(make_invocation("!combat next", next_))
+
+    def test_group_pays(self):
+        assert not subcommand_follows(make_invocation("!combat", combat))
+        assert not subcommand_follows(make_invocation("!combat foo", combat))
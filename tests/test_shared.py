@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from pnpbot.character import Attribute, Character
+from pnpbot.cluster import Campaign, Coordinator, assign_campaigns
+from pnpbot.shared import CampaignStorage, LeaseLostException, SharedStore
+
+
+def make_character(value: int) -> Character:
+    return Character("Alrik", [Attribute(name="LeP", value=value, maximum=30)])
+
+
+class TestSharedStore:
+    def test_lease(self, tmp_path):
+        store = SharedStore(tmp_path / "store.sqlite")
+        assert store.acquire("a", "w1", ttl=10, now=0) == 1
+        assert store.acquire("a", "w2", ttl=10, now=5) is None
+        assert store.renew("a", "w1", 1, ttl=10, now=5)
+        assert store.owners(now=5) == {"a": "w1"}
+
+        # Once expired, the lease moves on with a new token
+        assert store.acquire("a", "w2", ttl=10, now=16) == 2
+        assert not store.renew("a", "w1", 1, ttl=10, now=16)
+
+        store.release("a", "w2", 2)
+        assert store.owners(now=16) == {}
+        assert store.acquire("a", "w1", ttl=10, now=16) == 3
+
+    def test_failover(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        first = CampaignStorage(SharedStore(path), "a", 0)
+        first.token = first.store.acquire("a", "w1", ttl=10, now=0)
+
+        characters = {1: make_character(5), 2: make_character(7)}
+        first.save_characters(characters, [1, 2])
+        del characters[2]
+        first.save_characters(characters, [2])
+
+        second_store = SharedStore(path)
+        token = second_store.acquire("a", "w2", ttl=10, now=20)
+        second = CampaignStorage(second_store, "a", token)
+        loaded = second.load_characters()
+        assert list(loaded) == [1]
+        assert loaded[1].get_attribute("LeP").value == 5
+
+        # The previous owner can't write anymore
+        with pytest.raises(LeaseLostException):
+            first.save_characters(characters, [1])
+
+    def test_locales(self, tmp_path):
+        store = SharedStore(tmp_path / "store.sqlite")
+        token = store.acquire("a", "w1", ttl=10, now=0)
+        CampaignStorage(store, "a", token).save_locale(100, "en")
+
+        assert CampaignStorage(store, "a", token).load_locales() == {100: "en"}
+        assert CampaignStorage(store, "b", 0).load_locales() == {}
+
+        with pytest.raises(LeaseLostException):
+            CampaignStorage(store, "a", token + 1).save_locale(100, "de")
+
+    def test_assign_campaigns(self):
+        current = {"a": "w1", "b": "w2", "c": "w2"}
+        assignments = assign_campaigns(["a", "b", "c", "d"], ["w1", "w3"], current)
+        assert assignments == {"a": "w1", "b": "w3", "c": "w1", "d": "w3"}
+
+    def test_restart(self, tmp_path, monkeypatch):
+        campaigns = [Campaign(name, "token", 0, "dsa") for name in "abcd"]
+        coordinator = Coordinator(tmp_path / "store.sqlite", campaigns, 2)
+        restarted = []
+        monkeypatch.setattr(coordinator, "start_worker", restarted.append)
+        coordinator.reassign(coordinator.worker_names)
+        before = coordinator.store.assignments()
+
+        # Up for longer than a lease, so it takes its own campaigns back
+        coordinator.started = {"worker-0": 0.0, "worker-1": 0.0}
+        coordinator.restart(["worker-0"])
+        assert restarted == ["worker-0"]
+        assert coordinator.store.assignments() == before
+
+        # Died again right after its restart, so the others take over
+        coordinator.started["worker-0"] = time.monotonic()
+        coordinator.restart(["worker-0"])
+        assert set(coordinator.store.assignments().values()) == {"worker-1"}
+
+    def test_assign_rolls_back(self, tmp_path):
+        store = SharedStore(tmp_path / "store.sqlite")
+        store.assign({"a": "w1"})
+
+        with pytest.raises(Exception):
+            store.assign({"a": "w2", "b": object()})  # type: ignore
+        assert store.assignments() == {"a": "w1"}
+        store.assign({"b": "w2"})
+        assert store.assignments() == {"b": "w2"}
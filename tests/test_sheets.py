@@ -0,0 +1,155 @@
+import io
+import pytest
+from typing import Optional
+from discord.ext.commands import Context
+from pnpbot.character import Attribute, Character
+from pnpbot.systems.base import BaseSystem
+from pnpbot.sheets import (
+    SheetFormat,
+    SheetRowError,
+    UnknownSheetFormatException,
+    export_sheets,
+    ImportReport,
+    import_sheets,
+    read_sheets,
+    resolve_chunk,
+    validate_chunks,
+)
+from pnpbot.messages import get_catalog
+
+
+class MySystem(BaseSystem):
+    Attributes = ["Stärke", "HP"]
+
+    def handle_roll(self, ctx: Context, character: Optional[Character]):
+        pass
+
+
+def resolve_player(player: str) -> Optional[int]:
+    return int(player) if player.isdigit() else None
+
+
+CSV = """player,name,Stärke,HP
+1,Alrik,5,3/10
+2,Boron,x,3/10
+abc,Cora,5,3/10
+4,Dora,5,
+1,Alrik,5,3/10
+"""
+
+
+class TestSheets:
+    def test_format_from_filename(self):
+        assert SheetFormat.from_filename("a.CSV") == SheetFormat.CSV
+        assert SheetFormat.from_filename("a.jsonl") == SheetFormat.JSONL
+        with pytest.raises(UnknownSheetFormatException):
+            SheetFormat.from_filename("a.txt")
+
+    def test_import_csv(self):
+        commits = []
+        report = import_sheets(
+            MySystem(),
+            read_sheets(io.StringIO(CSV), SheetFormat.CSV),
+            resolve_player,
+            commits.append,
+            chunk_size=2,
+        )
+
+        assert report.imported == 1
+        assert [error.line for error in report.errors] == [3, 4, 5, 6]
+        assert len(commits) == 1
+
+        user_id, name, attributes = commits[0][0]
+        assert (user_id, name) == (1, "Alrik")
+        assert [str(attr) for attr in attributes] == ["5", "3/10"]
+
+    def test_import_existing(self):
+        report = import_sheets(
+            MySystem(),
+            read_sheets(io.StringIO(CSV), SheetFormat.CSV),
+            resolve_player,
+            lambda entries: None,
+            existing={1},
+        )
+        assert report.imported == 0
+
+    def test_resolve_at_commit(self):
+        rows = read_sheets(io.StringIO(CSV), SheetFormat.CSV)
+        chunks = list(validate_chunks(MySystem(), rows, chunk_size=10))
+        assert len(chunks) == 1
+
+        # Alrik was added while the chunk was validated, so the sheet can't replace him
+        report = ImportReport()
+        entries = resolve_chunk(
+            chunks[0], resolve_player, {1}, set(), report, get_catalog()
+        )
+        assert entries == []
+        assert [error.line for error in report.errors] == [2, 3, 4, 5, 6]
+
+    def test_import_invalid_jsonl(self):
+        rows = list(read_sheets(io.StringIO("{\n"), SheetFormat.JSONL))
+        assert isinstance(rows[0], SheetRowError)
+
+    @pytest.mark.parametrize("sheet_format", [SheetFormat.CSV, SheetFormat.JSONL])
+    def test_roundtrip(self, sheet_format: SheetFormat):
+        characters = {
+            7: Character(
+                "Alrik",
+                [
+                    Attribute(name="Stärke", value=5),
+                    Attribute(name="HP", value=3, minimum=1, maximum=10, limited=True),
+                ],
+            )
+        }
+        content = "".join(export_sheets(characters, ["Stärke", "HP"], sheet_format))
+
+        commits = []
+        report = import_sheets(
+            MySystem(),
+            read_sheets(io.StringIO(content), sheet_format),
+            resolve_player,
+            commits.extend,
+        )
+
+        assert report.errors == []
+        user_id, name, attributes = commits[0]
+        assert (user_id, name) == (7, "Alrik")
+        hp = attributes[1]
+        assert (hp.minimum, hp.value, hp.maximum) == (1, 3, 10)
+
+    def test_import_if_version(self):
+        character = Character(
+            "Alrik", [Attribute(name="Stärke", value=5), Attribute(name="HP", value=3)]
+        )
+        character.update("Stärke", 6)
+        characters = {1: character}
+
+        def patch(user_id, version, values):
+            characters[user_id].apply_patch(version, values)
+
+        content = "player,name,version,Stärke\n1,Alrik,1,7\n1,Alrik,1,8\n"
+        report = import_sheets(
+            MySystem(),
+            read_sheets(io.StringIO(content), SheetFormat.CSV),
+            resolve_player,
+            lambda entries: None,
+            existing=characters,
+            patch=patch,
+        )
+        assert (report.imported, report.updated) == (0, 1)
+        assert [error.line for error in report.errors] == [3]
+        assert character.version == 2
+        assert [str(stat) for stat in character.changes_since(1)] == ["7"]
+
+        # The character moved on to version 2 in the meantime
+        report = import_sheets(
+            MySystem(),
+            read_sheets(io.StringIO(content), SheetFormat.CSV),
+            resolve_player,
+            lambda entries: None,
+            existing=characters,
+            patch=patch,
+        )
+        assert report.updated == 0
+        assert "2" in report.errors[0].message
+        assert character.get_attribute("Stärke").value == 7
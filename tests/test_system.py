@@ -7,7 +7,15 @@ from pnpbot.systems.base import (
     RollArgumentAnnotationMissingException,
     MissingBaseArgumentsException,
 )
-from pnpbot.character import Character
+from pnpbot.character import (
+    Attribute,
+    Character,
+    Formula,
+    AnonymousAttributeException,
+    AttributeParseException,
+    MissingAttributesException,
+    UnknownAttributeException,
+)
 
 
 class MyEmptySystem(BaseSystem):
@@ -41,6 +49,14 @@ class MySystem(BaseSystem):
         pass
 
 
+class MyDerivedSystem(MyEmptySystem):
+    Attributes = [
+        "KO",
+        Attribute(name="LeP", limited=True, spendable=True, formula=Formula("KO * 2")),
+        Attribute(name="AsP", limited=True, spendable=True),
+    ]
+
+
 class TestSystem:
     def test_empty_roll_args(self):
         sys = MyEmptySystem()
@@ -72,3 +88,48 @@ class TestSystem:
             assert sys.find_proper_name(attribute.lower()) == attribute
 
         assert sys.find_proper_name("unknown") == None
+
+    def test_parse_attributes(self):
+        sys = MySystem()
+        attributes = sys.parse_attributes(["stärke=5", "INTELLIGENZ=3/7", "geschick=2"])
+
+        assert [a.name for a in attributes] == ["Stärke", "Intelligenz", "gEsChIcK"]
+        assert attributes[1].limited
+
+    def test_validate_attributes_all_errors(self):
+        sys = MySystem()
+        attributes, errors = sys.validate_attributes(
+            ["stärke=x", "5", "mana=3", "intelligenz=9/3"]
+        )
+
+        assert attributes == []
+        assert [type(e) for e in errors] == [
+            AttributeParseException,
+            AnonymousAttributeException,
+            UnknownAttributeException,
+            AttributeParseException,
+            MissingAttributesException,
+        ]
+        assert errors[-1].missing == ["gEsChIcK"]
+
+    def test_parse_attributes_first_error(self):
+        sys = MySystem()
+        with pytest.raises(UnknownAttributeException):
+            sys.parse_attributes(["mana=3", "stärke=x"])
+
+    def test_migrate_character(self):
+        sys = MyDerivedSystem()
+        # Stored before LeP was derived and AsP was a pool
+        character = Character(
+            "Old", [Attribute(name="KO", value=12), Attribute(name="AsP", value=5)],
+        )
+
+        sys.migrate_character(character)
+
+        lep = character.get_attribute("LeP")
+        assert (lep.value, lep.maximum, lep.limited) == (24, 24, True)
+        asp = character.get_attribute("AsP")
+        assert (asp.value, asp.maximum, asp.spendable) == (5, 5, True)
+
+        character.update("KO", 10)
+        assert character.get_attribute("LeP").maximum == 20